@@ -0,0 +1,78 @@
+"""
+Benchmark the time pytest-mpl adds to the startup of pytest.
+
+This runs pytest on a suite without figure tests, with and without the plugin
+enabled, and reports the difference in their run times. It also lists which of
+the heavy dependencies of pytest-mpl were imported, since none of them should
+be imported until a figure test or summary needs them::
+
+    python benchmarks/imports.py --repeat 20
+
+"""
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+from pathlib import Path
+
+#: Modules which should only be imported when they are needed.
+HEAVY_MODULES = ['matplotlib', 'numpy', 'PIL', 'jinja2', 'imagehash', 'sqlite3', 'multiprocessing',
+                 'concurrent.futures.process']
+
+TEST_MODULE = """
+def test_nothing():
+    pass
+"""
+
+CONFTEST = """
+import sys
+import json
+
+def pytest_unconfigure(config):
+    modules = [name for name in {modules!r} if name in sys.modules]
+    with open("modules.json", "w") as fp:
+        json.dump(modules, fp)
+"""
+
+
+def run_pytest(suite, args):
+    """Run pytest on the suite and return the wall time and the imported heavy modules."""
+    command = [sys.executable, '-m', 'pytest', '-q', '-p', 'no:cacheprovider', *args]
+    start = time.perf_counter()
+    subprocess.run(command, cwd=suite, check=True, stdout=subprocess.DEVNULL)
+    wall = time.perf_counter() - start
+    with open(suite / 'modules.json') as fp:
+        return wall, json.load(fp)
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--repeat', type=int, default=10,
+                        help='Number of runs of each configuration; the fastest is kept.')
+    args = parser.parse_args(args)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        suite = Path(tmp_dir)
+        (suite / 'test_plain.py').write_text(TEST_MODULE)
+        (suite / 'conftest.py').write_text(CONFTEST.format(modules=HEAVY_MODULES))
+        configurations = {
+            'without pytest-mpl': ['-p', 'no:pytest_mpl'],
+            'pytest-mpl': [],
+            'pytest-mpl --mpl': ['--mpl'],
+        }
+        results = {}
+        for name, pytest_args in configurations.items():
+            runs = [run_pytest(suite, pytest_args) for _ in range(args.repeat)]
+            results[name] = min(runs)
+
+    reference = results['without pytest-mpl'][0]
+    print(f"{'configuration':>20} {'wall':>10} {'overhead':>10}  imported")
+    for name, (wall, modules) in results.items():
+        print(f"{name:>20} {wall * 1000:8.1f}ms {(wall - reference) * 1000:8.1f}ms  "
+              f"{', '.join(modules) or '-'}")
+
+
+if __name__ == '__main__':
+    main()
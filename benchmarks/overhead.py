@@ -0,0 +1,205 @@
+"""
+Benchmark the overhead of pytest-mpl per figure test.
+
+This generates a synthetic suite of figure tests, and the baseline images and
+hash library for it, and then runs the suite in image, hash and hybrid modes,
+with and without summaries. Each configuration is compared with a run of the
+suite without ``--mpl``, in which the figures are only created, to give the
+overhead of the plugin per test, including the loading of hash libraries and
+the rendering of summaries, and the time spent in each phase of the plugin
+is measured by ``timing_plugin.py``.
+
+The results are written to a JSON file in ``benchmarks/results`` by default, and
+can be compared with the results of a previous run, e.g. of the last release::
+
+    python benchmarks/overhead.py --tests 200 --compare benchmarks/results/0.17.0-*.json
+
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import subprocess
+from pathlib import Path
+from datetime import datetime, timezone
+
+HERE = Path(__file__).parent.absolute()
+
+MODES = ['image', 'hash', 'hybrid']
+SUMMARIES = ['none', 'json', 'html', 'basic-html', 'lazy-html']
+PHASES = ['savefig', 'hashing', 'baseline_io', 'conversion', 'comparison', 'summary']
+
+TEST_MODULE = """
+import matplotlib.pyplot as plt
+import pytest
+
+
+@pytest.mark.mpl_image_compare
+@pytest.mark.parametrize("i", range({tests}))
+def test_figure(i):
+    fig, ax = plt.subplots()
+    ax.plot([1, i % 7, 3, i % 5])
+    ax.set_title(f"Figure {{i}}")
+    return fig
+"""
+
+
+def mode_args(mode, suite):
+    """Return the pytest arguments of a mode."""
+    if mode == 'image':
+        return ['--mpl', f'--mpl-baseline-path={suite / "baseline"}']
+    if mode == 'hash':
+        return ['--mpl', f'--mpl-hash-library={suite / "hashes.json"}']
+    if mode == 'hybrid':
+        return ['--mpl', f'--mpl-baseline-path={suite / "baseline"}',
+                f'--mpl-hash-library={suite / "hashes.json"}']
+    raise ValueError(f"Unknown mode {mode!r}")
+
+
+def run_pytest(suite, args, timings_file=None):
+    """Run the suite with pytest and return the wall time and the phase timings."""
+    env = dict(os.environ, MPLBACKEND='Agg')
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [str(HERE), env.get('PYTHONPATH')]))
+    if timings_file is not None:
+        env['MPL_BENCHMARK_TIMINGS'] = str(timings_file)
+    command = [sys.executable, '-m', 'pytest', '-q', '-p', 'no:cacheprovider',
+               '-p', 'timing_plugin', *args]
+    start = time.perf_counter()
+    process = subprocess.run(command, cwd=suite, env=env,
+                             stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    wall = time.perf_counter() - start
+    if process.returncode != 0:
+        output = process.stdout.decode(errors='replace')
+        raise RuntimeError(f"pytest {' '.join(args)} failed:\n{output}")
+    timings = {}
+    if timings_file is not None:
+        with open(timings_file) as fp:
+            timings = json.load(fp)
+    return wall, timings
+
+
+def create_suite(suite, tests):
+    """Write the test module and generate its baseline images and hash library."""
+    (suite / 'test_figures.py').write_text(TEST_MODULE.format(tests=tests))
+    run_pytest(suite, [f'--mpl-generate-path={suite / "baseline"}'])
+    run_pytest(suite, [f'--mpl-generate-hash-library={suite / "hashes.json"}'])
+
+
+def benchmark(suite, mode, summary, repeat):
+    """Return the timings of the fastest of ``repeat`` runs of a configuration."""
+    args = [] if mode == 'none' else mode_args(mode, suite)
+    if summary != 'none':
+        args += [f'--mpl-generate-summary={summary}', f'--mpl-results-path={suite / "results"}']
+    best = None
+    for _ in range(repeat):
+        wall, timings = run_pytest(suite, args, suite / 'timings.json')
+        if best is None or wall < best['wall']:
+            best = {'wall': wall, 'phases': {phase: timings.get(phase, 0.0) for phase in PHASES},
+                    'test_call': timings.get('test_call', 0.0)}
+    return best
+
+
+def run_benchmarks(tests, modes, summaries, repeat):
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        suite = Path(tmp_dir)
+        create_suite(suite, tests)
+        reference = benchmark(suite, 'none', 'none', repeat)
+        results['none'] = reference
+        for mode in modes:
+            for summary in summaries:
+                name = mode if summary == 'none' else f'{mode}+{summary}'
+                result = benchmark(suite, mode, summary, repeat)
+                result['overhead_per_test'] = (result['wall'] - reference['wall']) / tests
+                results[name] = result
+                print_result(name, result, tests)
+    return results
+
+
+def environment():
+    import matplotlib
+    import pytest
+
+    import pytest_mpl
+    return {
+        'pytest-mpl': pytest_mpl.__version__,
+        'matplotlib': matplotlib.__version__,
+        'pytest': pytest.__version__,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+    }
+
+
+def print_header():
+    columns = ['wall', 'overhead/test'] + PHASES
+    print(f"{'configuration':>16} " + ' '.join(f'{column:>14}' for column in columns))
+
+
+def print_result(name, result, tests):
+    values = [f"{result['wall']:.2f}s", f"{result['overhead_per_test'] * 1000:.2f}ms"]
+    values += [f"{result['phases'][phase] * 1000 / tests:.2f}ms" for phase in PHASES]
+    print(f'{name:>16} ' + ' '.join(f'{value:>14}' for value in values), flush=True)
+
+
+def print_comparison(results, previous):
+    """Print the change in overhead per test since a previous run."""
+    print(f"\nOverhead per test compared with pytest-mpl "
+          f"{previous['environment']['pytest-mpl']}:")
+    for name, result in results['results'].items():
+        if name == 'none' or name not in previous['results']:
+            continue
+        before = previous['results'][name]['overhead_per_test']
+        after = result['overhead_per_test']
+        change = (after - before) / before * 100 if before > 0 else float('nan')
+        print(f'{name:>16} {before * 1000:10.2f}ms -> {after * 1000:10.2f}ms ({change:+.1f}%)')
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--tests', type=int, default=100,
+                        help='Number of figure tests in the suite.')
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=MODES,
+                        help='Comparison modes to benchmark.')
+    parser.add_argument('--summaries', nargs='+', choices=SUMMARIES, default=['none', 'html'],
+                        help='Summary formats to benchmark, or none.')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='Number of runs of each configuration; the fastest is kept.')
+    parser.add_argument('--output', type=Path,
+                        help='File to write the results to. Defaults to a file named after '
+                             'the version of pytest-mpl in benchmarks/results.')
+    parser.add_argument('--compare', type=Path,
+                        help='Results of a previous run to compare with.')
+    args = parser.parse_args(args)
+
+    env = environment()
+    print(f"pytest-mpl {env['pytest-mpl']}, matplotlib {env['matplotlib']}, "
+          f"Python {env['python']}, {args.tests} tests, best of {args.repeat}")
+    print_header()
+    results = {
+        'environment': env,
+        'date': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'tests': args.tests,
+        'repeat': args.repeat,
+        'results': run_benchmarks(args.tests, args.modes, args.summaries, args.repeat),
+    }
+
+    output = args.output
+    if output is None:
+        stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+        output = HERE / 'results' / f"{env['pytest-mpl']}-{stamp}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w') as fp:
+        json.dump(results, fp, indent=2)
+    print(f'\nResults written to {output}')
+
+    if args.compare is not None:
+        with open(args.compare) as fp:
+            print_comparison(results, json.load(fp))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""
+pytest plugin which measures the time spent in each phase of pytest-mpl.
+
+It is loaded by ``overhead.py`` into the synthetic test suites, with
+``-p timing_plugin``, and writes the timings to the JSON file named by the
+``MPL_BENCHMARK_TIMINGS`` environment variable. Phases are timed exclusively,
+i.e. the time spent rendering a figure while hashing it is only counted as
+rendering.
+"""
+import os
+import json
+import time
+import functools
+import importlib
+
+import pytest
+
+#: Functions to time, by phase, as ``module:attribute``.
+PHASES = {
+    'savefig': ['pytest_mpl.plugin:ImageComparison.render_figure'],
+    'hashing': ['pytest_mpl.plugin:ImageComparison.generate_image_hash'],
+    'baseline_io': ['pytest_mpl.plugin:ImageComparison.obtain_baseline_image',
+                    'pytest_mpl.plugin:ImageComparison.prefetch_baseline_images',
+                    'pytest_mpl.plugin:ImageComparison.load_hash_library',
+                    'pytest_mpl.plugin:ImageComparison.baseline_digest'],
+    'conversion': ['pytest_mpl.plugin:ImageComparison.convert_baseline_image',
+                   'pytest_mpl.plugin:ImageComparison.convert_result_image'],
+    'comparison': ['pytest_mpl.plugin:ImageComparison.compare_image_to_baseline',
+                   'pytest_mpl.plugin:ImageComparison.compare_image_to_hash_library',
+                   'pytest_mpl.comparison:compare_image_data'],
+    'summary': ['pytest_mpl.plugin:ImageComparison.generate_summary_json',
+                'pytest_mpl.summary.html:generate_thumbnails',
+                'pytest_mpl.summary.html:generate_summary_html',
+                'pytest_mpl.summary.html:generate_summary_basic_html',
+                'pytest_mpl.summary.html:generate_summary_lazy_html'],
+}
+
+timings = {phase: 0.0 for phase in PHASES}
+timings['test_call'] = 0.0
+_stack = []
+
+
+def timed(phase, function):
+    """Wrap a function to add the time spent in it, excluding other phases, to a phase."""
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        _stack.append(0.0)  # Time spent in nested phases
+        try:
+            return function(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            nested = _stack.pop()
+            timings[phase] += elapsed - nested
+            if _stack:
+                _stack[-1] += elapsed
+    return wrapper
+
+
+def pytest_configure(config):
+    for phase, names in PHASES.items():
+        for name in names:
+            module, path = name.split(':')
+            owner = importlib.import_module(module)
+            *path, attribute = path.split('.')
+            for part in path:
+                owner = getattr(owner, part)
+            setattr(owner, attribute, timed(phase, getattr(owner, attribute)))
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_call(item):
+    start = time.perf_counter()
+    yield
+    timings['test_call'] += time.perf_counter() - start
+
+
+@pytest.hookimpl(trylast=True)
+def pytest_unconfigure(config):
+    # Runs after pytest-mpl has written the hash library and summaries
+    path = os.environ.get('MPL_BENCHMARK_TIMINGS')
+    if path:
+        with open(path, 'w') as fp:
+            json.dump(timings, fp)
@@ -0,0 +1,265 @@
+"""
+This module contains the persistent cache of downloaded baseline images.
+
+"""
+import io
+import os
+import re
+import json
+import time
+import hashlib
+import tempfile
+import threading
+import http.client
+from pathlib import Path
+from email.utils import formatdate, parsedate_to_datetime
+from urllib.error import HTTPError
+from urllib.parse import urljoin, urlsplit, urlunsplit
+from urllib.request import Request, urlopen
+from urllib.response import addinfourl
+
+__all__ = ['BaselineCache', 'KeepAliveOpener', 'is_network_error']
+
+#: Pattern of the ``max-age`` directive of a ``Cache-Control`` header.
+MAX_AGE = re.compile(r'max-age\s*=\s*(\d+)')
+
+#: HTTP status codes of redirects which are followed.
+REDIRECT_CODES = (301, 302, 303, 307, 308)
+
+
+def is_network_error(error):
+    """
+    Whether a download failed because the server could not be reached, or
+    failed to respond, rather than because it rejected the request.
+
+    Only after these errors may a stale cached copy of an image be used.
+    """
+    if isinstance(error, HTTPError):
+        return error.code >= 500
+    return isinstance(error, (OSError, http.client.HTTPException))
+
+
+def _expiry(headers):
+    """
+    Return the time until which a response can be used without revalidation.
+    """
+    cache_control = headers.get('Cache-Control', '').lower()
+    if 'no-cache' in cache_control or 'no-store' in cache_control:
+        return 0
+    max_age = MAX_AGE.search(cache_control)
+    if max_age:
+        return time.time() + int(max_age.group(1))
+    expires = headers.get('Expires')
+    if expires:
+        try:
+            return parsedate_to_datetime(expires).timestamp()
+        except (TypeError, ValueError):
+            return 0
+    return 0
+
+
+def _atomic_write(path, data):
+    """
+    Write data to path so that concurrent readers never see a partial file.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as fp:
+            fp.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+class BaselineCache:
+    """
+    Content-addressed cache of baseline images downloaded from URLs.
+
+    Downloaded images are stored once per unique content under
+    ``objects/``, and the validators of each URL (``ETag``,
+    ``Last-Modified`` and the freshness lifetime) are kept under
+    ``index/``. Fresh entries are served without any network I/O, while
+    stale entries are revalidated with a conditional request.
+
+    Parameters
+    ----------
+    directory : str or Path
+        Directory in which to store the cache. It is created if needed.
+    """
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        # URLs which have been validated during this session
+        self._validated = {}
+
+    def _index_path(self, url):
+        key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        return self.directory / 'index' / f'{key}.json'
+
+    def _object_path(self, digest):
+        return self.directory / 'objects' / digest[:2] / digest
+
+    def _load_entry(self, url):
+        try:
+            with open(self._index_path(url)) as fp:
+                entry = json.load(fp)
+        except (OSError, ValueError):
+            return None
+        if entry.get('url') != url or not self._object_path(entry['digest']).exists():
+            return None
+        return entry
+
+    def _save_entry(self, url, entry):
+        data = json.dumps(dict(entry, url=url)).encode('utf-8')
+        _atomic_write(self._index_path(url), data)
+
+    def cached(self, url):
+        """
+        Return the cached image for the URL, however stale, or `None`.
+        """
+        entry = self._load_entry(url)
+        if entry is None:
+            return None
+        return self._object_path(entry['digest'])
+
+    def fetch(self, url, opener=urlopen):
+        """
+        Return the path to a local copy of the image at the URL.
+
+        Parameters
+        ----------
+        url : str
+            The URL of the image.
+        opener : callable, optional
+            Function used to open a `urllib.request.Request`.
+
+        Raises
+        ------
+        Exception
+            Any error raised while downloading the image.
+        """
+        if url in self._validated:
+            return self._validated[url]
+
+        entry = self._load_entry(url)
+        if entry is not None and entry['expires'] > time.time():
+            path = self._validated[url] = self._object_path(entry['digest'])
+            return path
+
+        request = Request(url)
+        if entry is not None:
+            if entry.get('etag'):
+                request.add_header('If-None-Match', entry['etag'])
+            request.add_header('If-Modified-Since',
+                               entry.get('last_modified') or
+                               formatdate(entry['stored'], usegmt=True))
+        try:
+            response = opener(request)
+            content = response.read()
+        except HTTPError as e:
+            if e.code != 304 or entry is None:
+                raise
+            # Not modified, refresh the lifetime of the cached copy
+            entry['expires'] = _expiry(e.headers)
+            self._save_entry(url, entry)
+        else:
+            digest = hashlib.sha256(content).hexdigest()
+            path = self._object_path(digest)
+            if not path.exists():
+                _atomic_write(path, content)
+            entry = {
+                'digest': digest,
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+                'expires': _expiry(response.headers),
+                'stored': time.time(),
+            }
+            self._save_entry(url, entry)
+
+        path = self._validated[url] = self._object_path(entry['digest'])
+        return path
+
+
+class KeepAliveOpener:
+    """
+    Open requests over persistent HTTP connections.
+
+    Each thread keeps one connection per host, so that the connection is
+    reused for all of the requests made by that thread. Responses mirror
+    those of `urllib.request.urlopen`, including raising
+    `urllib.error.HTTPError` for error (and ``304 Not Modified``) responses.
+    Redirects are followed.
+
+    Parameters
+    ----------
+    timeout : float, optional
+        Timeout in seconds of blocking connection operations.
+    max_redirects : int, optional
+        Maximum number of redirects to follow for a request.
+    """
+
+    def __init__(self, timeout=60, max_redirects=5):
+        self.timeout = timeout
+        self.max_redirects = max_redirects
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = []
+
+    def _connection(self, scheme, netloc):
+        connections = self._local.__dict__.setdefault('connections', {})
+        connection = connections.get((scheme, netloc))
+        if connection is None:
+            if scheme == 'https':
+                cls = http.client.HTTPSConnection
+            else:
+                cls = http.client.HTTPConnection
+            connection = connections[(scheme, netloc)] = cls(netloc, timeout=self.timeout)
+            with self._lock:
+                self._connections.append(connection)
+        return connection
+
+    def _get(self, url, headers):
+        parts = urlsplit(url)
+        if parts.scheme not in ('http', 'https'):
+            raise ValueError(f'Unsupported URL scheme {parts.scheme!r}')
+        connection = self._connection(parts.scheme, parts.netloc)
+        path = urlunsplit(('', '', parts.path or '/', parts.query, ''))
+        try:
+            connection.request('GET', path, headers=headers)
+            response = connection.getresponse()
+        except (http.client.HTTPException, ConnectionError):
+            # The server may have closed an idle connection, so retry once
+            # over a new connection
+            connection.close()
+            connection.request('GET', path, headers=headers)
+            response = connection.getresponse()
+        # The body must be consumed before the connection can be reused
+        content = response.read()
+        return response, content
+
+    def __call__(self, request):
+        url = request.full_url
+        headers = dict(request.header_items())
+        for _ in range(self.max_redirects + 1):
+            response, content = self._get(url, headers)
+            location = response.getheader('Location')
+            if response.status in REDIRECT_CODES and location:
+                url = urljoin(url, location)
+                continue
+            if response.status >= 300:
+                raise HTTPError(url, response.status, response.reason,
+                                response.headers, io.BytesIO(content))
+            return addinfourl(io.BytesIO(content), response.headers, url, response.status)
+        raise HTTPError(url, response.status, 'Too many redirects',
+                        response.headers, io.BytesIO(content))
+
+    def close(self):
+        """
+        Close all of the connections opened by any thread.
+        """
+        with self._lock:
+            for connection in self._connections:
+                connection.close()
+            self._connections = []
@@ -0,0 +1,229 @@
+"""
+This module contains the comparison engine for raster images.
+
+Each image is only decoded once, and the RMS difference is calculated with
+integer arithmetic, so the comparison is much cheaper than
+`matplotlib.testing.compare.compare_images`. The results are the same.
+
+"""
+import io
+import mmap
+import contextlib
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+__all__ = ['map_file', 'load_image', 'crop_to_same', 'calculate_rms', 'save_diff_image',
+           'compare_arrays', 'compare_image_data']
+
+
+@contextlib.contextmanager
+def map_file(filename):
+    """
+    Memory map a file for reading, so that it is read without being copied.
+
+    Parameters
+    ----------
+    filename : str or Path
+        The file to map.
+
+    Yields
+    ------
+    mmap.mmap or bytes
+        The read-only contents of the file.
+    """
+    with open(str(filename), 'rb') as fp:
+        try:
+            data = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # Empty files can't be mapped
+            yield b''
+            return
+        with data:
+            yield data
+
+
+def load_image(source):
+    """
+    Decode an image into an array of 8-bit RGB or RGBA pixels.
+
+    Fully opaque images are returned as RGB so that they compare equal to
+    RGB images, like `matplotlib.testing.compare`.
+
+    Parameters
+    ----------
+    source : str or Path or file-like
+        The image file, which is memory mapped, or an open binary stream of it.
+
+    Returns
+    -------
+    numpy.ndarray
+        An ``(height, width, channels)`` array of ``uint8`` values.
+    """
+    if isinstance(source, (str, Path)):
+        with map_file(source) as data:
+            return load_image(data)
+    with Image.open(source) as img:
+        if img.mode != 'RGB':
+            if img.mode != 'RGBA':
+                img = img.convert('RGBA')
+            # The alpha channel is redundant if its smallest value is 255
+            if img.getextrema()[3][0] == 255:
+                img = img.convert('RGB')
+        return np.asarray(img)
+
+
+def _match_channels(expected, actual):
+    """
+    Add an opaque alpha channel to an RGB image compared to an RGBA image.
+    """
+    if expected.shape[2] == actual.shape[2]:
+        return expected, actual
+
+    def rgba(image):
+        if image.shape[2] == 4:
+            return image
+        alpha = np.full(image.shape[:2] + (1,), 255, dtype=np.uint8)
+        return np.concatenate([image, alpha], axis=2)
+
+    return rgba(expected), rgba(actual)
+
+
+def crop_to_same(expected, actual):
+    """
+    Crop two images around their centres to their common size.
+
+    This is used for conversions of EPS files, whose bounding boxes may
+    differ by a pixel, like `matplotlib.testing.compare.crop_to_same`.
+
+    Parameters
+    ----------
+    expected, actual : numpy.ndarray
+        Arrays of pixels of any height and width.
+
+    Returns
+    -------
+    tuple of numpy.ndarray
+        Views of the expected and actual images with the same height and width.
+    """
+    height = min(expected.shape[0], actual.shape[0])
+    width = min(expected.shape[1], actual.shape[1])
+
+    def crop(image):
+        top = (image.shape[0] - height) // 2
+        left = (image.shape[1] - width) // 2
+        return image[top:top + height, left:left + width]
+
+    return crop(expected), crop(actual)
+
+
+def calculate_rms(expected, actual):
+    """
+    Calculate the root mean square of the per-pixel differences.
+
+    Parameters
+    ----------
+    expected, actual : numpy.ndarray
+        Arrays of ``uint8`` pixels with the same shape.
+
+    Returns
+    -------
+    float
+        The RMS difference, between 0 and 255.
+    """
+    diff = expected.astype(np.int32) - actual
+    return float(np.sqrt(np.einsum('ijk,ijk->', diff, diff, dtype=np.int64) / diff.size))
+
+
+def save_diff_image(expected, actual, output):
+    """
+    Save an image of the absolute pixel differences, amplified ten times.
+
+    Parameters
+    ----------
+    expected, actual : numpy.ndarray
+        Arrays of ``uint8`` pixels with the same shape.
+    output : str or Path
+        The file to save the PNG difference image to. Its directory is
+        created if needed.
+    """
+    abs_diff = np.abs(expected.astype(np.int16) - actual)
+    # Expand differences in luminance domain
+    abs_diff = np.minimum(abs_diff * 10, 255).astype(np.uint8)
+    if abs_diff.shape[2] == 4:  # Hard-code the alpha channel to fully solid
+        abs_diff[:, :, 3] = 255
+    Path(output).parent.mkdir(parents=True, exist_ok=True)
+    Image.fromarray(abs_diff).save(output, format='png')
+
+
+def compare_arrays(expected, actual, tol, diff_image):
+    """
+    Compare two decoded images of the same size, within a tolerance.
+
+    Parameters
+    ----------
+    expected, actual : numpy.ndarray
+        Arrays of ``uint8`` pixels, as returned by `load_image`, with the
+        same height and width.
+    tol : float
+        The maximum RMS difference for the images to be considered equal.
+    diff_image : str or Path
+        The file to save the difference image to, if the images differ.
+
+    Returns
+    -------
+    None or dict
+        `None` if the images are equal within the tolerance, otherwise a
+        dictionary with the ``rms``, ``diff`` image and ``tol`` tolerance.
+    """
+    expected, actual = _match_channels(expected, actual)
+
+    if tol <= 0 and np.array_equal(expected, actual):
+        return None
+
+    rms = calculate_rms(expected, actual)
+    if rms <= tol:
+        return None
+
+    save_diff_image(expected, actual, diff_image)
+    return dict(rms=rms, diff=str(diff_image), tol=tol)
+
+
+def compare_image_data(expected, actual, tol, diff_image, crop=False):
+    """
+    Compare a baseline image file to an encoded test image, within a tolerance.
+
+    This only takes and returns builtin types, so that it can be run in
+    another process.
+
+    Parameters
+    ----------
+    expected : str
+        The baseline image file.
+    actual : bytes
+        The encoded test image.
+    tol : float
+        The maximum RMS difference for the images to be considered equal.
+    diff_image : str
+        The file to save the difference image to, if the images differ.
+    crop : bool, optional
+        Whether to crop images of different sizes to their common size with
+        `crop_to_same` rather than failing the comparison.
+
+    Returns
+    -------
+    None or dict
+        `None` if the images are equal within the tolerance. If the sizes of
+        the images differ, and they aren't cropped, a dictionary with the ``expected_shape`` and
+        ``actual_shape``. Otherwise, a dictionary as returned by
+        `compare_arrays`.
+    """
+    expected_image = load_image(expected)
+    actual_image = load_image(io.BytesIO(actual))
+    if crop:
+        expected_image, actual_image = crop_to_same(expected_image, actual_image)
+    expected_shape = expected_image.shape[:2]
+    actual_shape = actual_image.shape[:2]
+    if expected_shape != actual_shape:
+        return dict(expected_shape=expected_shape, actual_shape=actual_shape)
+    return compare_arrays(expected_image, actual_image, tol, diff_image)
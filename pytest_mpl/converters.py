@@ -0,0 +1,131 @@
+"""
+This module contains the pool of converters of vector images to PNG.
+
+"""
+import re
+import queue
+import threading
+from pathlib import Path
+
+__all__ = ['ConverterPool']
+
+#: Pattern of the SVG font styles for which Matplotlib uses its own fonts
+#: when converting, which is kept in sync with `matplotlib.testing.compare`.
+SVG_FONT_STYLE = re.compile(r'style="[^"]*font(|-size|-weight|-family|-variant|-style):')
+
+
+def _matplotlib_converter(path):
+    """
+    Return the Matplotlib converter of a file, as chosen by
+    `matplotlib.testing.compare.convert`.
+    """
+    from matplotlib.testing import compare
+
+    ext = path.suffix[1:]
+    converter = compare.converter[ext]
+    fonts_converter = getattr(compare, '_svg_with_matplotlib_fonts_converter', None)
+    if ext == 'svg' and fonts_converter is not None:
+        if SVG_FONT_STYLE.search(path.read_text(encoding='utf-8')):
+            converter = fonts_converter
+    return converter
+
+
+def _is_long_lived(converter):
+    """
+    Whether a converter keeps a process running between conversions.
+
+    This relies on the private API of Matplotlib's converters, which keep
+    their process in ``_proc`` and stop it in ``__del__``. Converters which
+    don't have it are called directly.
+    """
+    return hasattr(converter, '_proc') and callable(getattr(type(converter), '__del__', None))
+
+
+def _stop(converter):
+    """
+    Stop the process of a long-lived converter.
+    """
+    type(converter).__del__(converter)
+
+
+class ConverterPool:
+    """
+    Pool of long-lived converters of vector images to PNG.
+
+    Matplotlib keeps a single Ghostscript and a single Inkscape process
+    running for the session, to which each image is sent to be converted,
+    so images are converted one at a time. This pool starts up to ``size``
+    processes of each kind, so that up to ``size`` images of each kind can be
+    converted in parallel, from any number of threads.
+
+    Converters which start a new process for each image, as in older
+    versions of Matplotlib, and converters without the private API which the
+    pool relies on, are called directly.
+
+    Parameters
+    ----------
+    size : int
+        Maximum number of processes of each kind of converter.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self._lock = threading.Lock()
+        self._idle = {}
+        self._started = {}
+        self._converters = []
+
+    def _acquire(self, prototype):
+        if not _is_long_lived(prototype):
+            return prototype
+        key = id(prototype)
+        with self._lock:
+            idle = self._idle.setdefault(key, queue.LifoQueue())
+            if idle.empty() and self._started.get(key, 0) < self.size:
+                self._started[key] = self._started.get(key, 0) + 1
+                converter = type(prototype)()
+                self._converters.append(converter)
+                return converter
+        return idle.get()
+
+    def _release(self, prototype, converter):
+        if converter is not prototype:
+            self._idle[id(prototype)].put(converter)
+
+    def convert(self, filename):
+        """
+        Convert an image to PNG, next to the image.
+
+        The PNG is named like by `matplotlib.testing.compare.convert`, e.g.
+        ``result_pdf.png`` for ``result.pdf``.
+
+        Parameters
+        ----------
+        filename : str or Path
+            The image to convert, whose format must have a converter.
+
+        Returns
+        -------
+        Path
+            The converted image.
+        """
+        path = Path(filename)
+        png = path.with_name(f"{path.stem}_{path.suffix[1:]}.png")
+        prototype = _matplotlib_converter(path)
+        converter = self._acquire(prototype)
+        try:
+            converter(path, png)
+        finally:
+            self._release(prototype, converter)
+        return png
+
+    def close(self):
+        """
+        Stop the processes of all of the converters started by the pool.
+        """
+        with self._lock:
+            for converter in self._converters:
+                _stop(converter)
+            self._converters = []
+            self._idle = {}
+            self._started = {}
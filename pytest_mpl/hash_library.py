@@ -0,0 +1,245 @@
+"""
+This module contains the readers and writers of hash libraries.
+
+A hash library is either a single JSON file of the hashes of all of the tests,
+a single SQLite database of them, or a directory of JSON shards, each of which
+holds the hashes of the tests of one test module (or class), with a manifest of
+the shards and the metadata of the library.
+
+"""
+import os
+import json
+import tempfile
+from pathlib import Path
+
+from pytest_mpl.cache import _atomic_write
+
+__all__ = ['HASH_LIBRARY_METADATA_KEY', 'MANIFEST_NAME', 'SQLITE_SUFFIXES', 'ShardedHashLibrary',
+           'SQLiteHashLibrary', 'is_sharded', 'is_sqlite', 'shard_name', 'library_file',
+           'read_hash_library', 'write_hash_library']
+
+#: Key of the metadata of the plugin in hash libraries.
+HASH_LIBRARY_METADATA_KEY = "pytest-mpl"
+
+#: Name of the manifest file of a sharded hash library.
+MANIFEST_NAME = "manifest.json"
+
+#: File extensions of SQLite hash libraries.
+SQLITE_SUFFIXES = (".sqlite", ".sqlite3", ".db")
+
+#: Maximum number of bytes of SQLite hash libraries to memory-map.
+SQLITE_MMAP_SIZE = 1 << 30
+
+
+def is_sharded(path):
+    """
+    Whether a hash library path is a sharded hash library, which is the case
+    for directories, and for paths without a file extension which don't exist.
+    """
+    path = Path(path)
+    if path.is_file():
+        return False
+    return path.is_dir() or not path.suffix
+
+
+def is_sqlite(path):
+    """
+    Whether a hash library path is a SQLite hash library.
+    """
+    return Path(path).suffix.lower() in SQLITE_SUFFIXES
+
+
+def shard_name(test_name):
+    """
+    Return the name of the shard of a test, which is the name of its module,
+    and of its class if it has one.
+    """
+    return test_name.split('[', 1)[0].rsplit('.', 1)[0]
+
+
+def library_file(path):
+    """
+    Return the file which identifies a hash library, which is the manifest
+    of sharded libraries and the library itself otherwise.
+    """
+    path = Path(path)
+    return path / MANIFEST_NAME if is_sharded(path) else path
+
+
+def _load_json(path):
+    with open(path, encoding='utf-8') as fp:
+        return json.load(fp)
+
+
+def _dump_json(path, data):
+    _atomic_write(Path(path), json.dumps(data, indent=2).encode('utf-8'))
+
+
+class ShardedHashLibrary:
+    """
+    Read-only view of a sharded hash library.
+
+    Shards are only loaded when the hash of one of their tests is looked up,
+    and are reloaded if they are modified.
+
+    Parameters
+    ----------
+    directory : str or Path
+        The directory of the library, which contains its manifest.
+    """
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        manifest = _load_json(self.directory / MANIFEST_NAME)
+        self.metadata = manifest.get(HASH_LIBRARY_METADATA_KEY)
+        self.shards = manifest.get('shards', {})
+        self._loaded = {}
+
+    def _shard(self, name):
+        path = self.directory / self.shards[name]
+        mtime = os.stat(path).st_mtime_ns
+        cached = self._loaded.get(name)
+        if cached is None or cached[0] != mtime:
+            cached = (mtime, _load_json(path))
+            self._loaded[name] = cached
+        return cached[1]
+
+    def get(self, test_name, default=None):
+        """Return the hash of a test, like `dict.get`."""
+        if test_name == HASH_LIBRARY_METADATA_KEY:
+            return default if self.metadata is None else self.metadata
+        name = shard_name(test_name)
+        if name not in self.shards:
+            return default
+        return self._shard(name).get(test_name, default)
+
+
+class SQLiteHashLibrary:
+    """
+    Read-only view of a SQLite hash library.
+
+    The hashes are stored in a table indexed by test name, so that looking up
+    the hash of a test doesn't need the library to be parsed. The database is
+    memory-mapped, so that lookups are served from the page cache.
+
+    Parameters
+    ----------
+    path : str or Path
+        The path of the database.
+    """
+
+    def __init__(self, path):
+        import sqlite3
+
+        self.path = Path(path)
+        uri = f"{self.path.absolute().as_uri()}?mode=ro"
+        self._connection = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        self._connection.execute(f"PRAGMA mmap_size = {SQLITE_MMAP_SIZE}")
+        row = self._connection.execute(
+            "SELECT value FROM metadata WHERE key = ?", (HASH_LIBRARY_METADATA_KEY,)).fetchone()
+        self.metadata = None if row is None else json.loads(row[0])
+
+    def get(self, test_name, default=None):
+        """Return the hash of a test, like `dict.get`."""
+        if test_name == HASH_LIBRARY_METADATA_KEY:
+            return default if self.metadata is None else self.metadata
+        row = self._connection.execute(
+            "SELECT hash FROM hashes WHERE name = ?", (test_name,)).fetchone()
+        return default if row is None else row[0]
+
+    def close(self):
+        self._connection.close()
+
+
+def _write_sqlite(path, library):
+    """
+    Write a SQLite hash library, replacing any existing library atomically.
+    """
+    import sqlite3
+
+    library = dict(library)
+    metadata = library.pop(HASH_LIBRARY_METADATA_KEY, None)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix='.tmp-', suffix=path.suffix)
+    os.close(fd)
+    try:
+        connection = sqlite3.connect(tmp_path)
+        try:
+            with connection:
+                connection.execute("CREATE TABLE metadata (key TEXT PRIMARY KEY, value TEXT) "
+                                   "WITHOUT ROWID")
+                connection.execute("CREATE TABLE hashes (name TEXT PRIMARY KEY, hash TEXT) "
+                                   "WITHOUT ROWID")
+                if metadata is not None:
+                    connection.execute("INSERT INTO metadata VALUES (?, ?)",
+                                       (HASH_LIBRARY_METADATA_KEY, json.dumps(metadata)))
+                connection.executemany("INSERT INTO hashes VALUES (?, ?)",
+                                       sorted(library.items()))
+        finally:
+            connection.close()
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def read_hash_library(path):
+    """
+    Return a hash library, which is a dictionary for single JSON files, a
+    `SQLiteHashLibrary` for SQLite databases and a `ShardedHashLibrary` for
+    sharded libraries.
+    """
+    if is_sqlite(path):
+        return SQLiteHashLibrary(path)
+    if is_sharded(path):
+        return ShardedHashLibrary(path)
+    return _load_json(path)
+
+
+def write_hash_library(path, library):
+    """
+    Write a hash library, including its metadata.
+
+    For sharded libraries, only the shards of the tests in ``library`` are
+    rewritten, and the shards of other tests are kept, unless the metadata of
+    the library has changed.
+
+    Parameters
+    ----------
+    path : str or Path
+        The path of the library.
+    library : dict
+        The hashes of the tests, and the metadata of the library.
+    """
+    path = Path(path)
+    if is_sqlite(path):
+        _write_sqlite(path, library)
+        return
+    if not is_sharded(path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w") as fp:
+            json.dump(library, fp, indent=2)
+        return
+
+    library = dict(library)
+    metadata = library.pop(HASH_LIBRARY_METADATA_KEY, None)
+    shards = {}
+    for test_name, test_hash in library.items():
+        shards.setdefault(shard_name(test_name), {})[test_name] = test_hash
+
+    manifest_path = path / MANIFEST_NAME
+    manifest = {}
+    if manifest_path.exists():
+        previous = _load_json(manifest_path)
+        if previous.get(HASH_LIBRARY_METADATA_KEY) == metadata:
+            manifest = previous.get('shards', {})
+        else:  # The hashes of the other shards are no longer valid
+            for name, filename in previous.get('shards', {}).items():
+                if name not in shards and (path / filename).exists():
+                    (path / filename).unlink()
+
+    for name, hashes in shards.items():
+        manifest[name] = f"{name}.json"
+        _dump_json(path / manifest[name], hashes)
+    manifest = {HASH_LIBRARY_METADATA_KEY: metadata, 'shards': dict(sorted(manifest.items()))}
+    _dump_json(manifest_path, manifest)
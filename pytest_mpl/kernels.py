@@ -5,9 +5,6 @@ This module contains the supported hashing kernel implementations.
 import hashlib
 from abc import ABC, abstractmethod
 
-import imagehash
-from PIL import Image
-
 #: The default hamming distance bit tolerance for "similar" imagehash hashes.
 DEFAULT_HAMMING_TOLERANCE = 4
 
@@ -39,6 +36,9 @@ class Kernel(ABC):
 
     """
 
+    #: Whether the kernel can only hash raster images, rather than any file.
+    raster_only = False
+
     def __init__(self, plugin):
         # Containment of the plugin allows the kernel to cherry-pick required state.
         self._plugin = plugin
@@ -143,6 +143,9 @@ class KernelPHash(Kernel):
 
     name = KERNEL_PHASH
 
+    # The image is decoded by Pillow.
+    raster_only = True
+
     def __init__(self, plugin):
         super().__init__(plugin)
         # Keep state of the equivalence result.
@@ -154,6 +157,7 @@ class KernelPHash(Kernel):
         self.hamming_tolerance = (
             int(arg) if arg is not None else DEFAULT_HAMMING_TOLERANCE
         )
+        self._default_hamming_tolerance = self.hamming_tolerance
         # The hash-size (N) defines the resultant N**2 bits hash size.
         arg = self._plugin.hash_size
         self.hash_size = int(arg) if arg is not None else DEFAULT_HASH_SIZE
@@ -167,11 +171,15 @@ class KernelPHash(Kernel):
         self.option = "hamming_tolerance"
 
     def equivalent_hash(self, result, baseline, marker=None):
+        # Don't carry over a tolerance overridden by a previous marker.
+        self.hamming_tolerance = self._default_hamming_tolerance
         if marker:
             value = marker.kwargs.get(self.option)
             if value is not None:
                 # Override with the decorator marker value.
                 self.hamming_tolerance = int(value)
+        import imagehash
+
         # Convert string hexdigest hashes to imagehash.ImageHash instances.
         result = imagehash.hex_to_hash(result)
         baseline = imagehash.hex_to_hash(baseline)
@@ -179,7 +187,7 @@ class KernelPHash(Kernel):
         # degree of "similarity" through hamming distance bit differences
         # between the hashes.
         try:
-            self.hamming_distance = result - baseline
+            self.hamming_distance = int(result - baseline)
             self.equivalent = self.hamming_distance <= self.hamming_tolerance
         except TypeError:
             # imagehash won't compare hashes of different sizes, however
@@ -189,6 +197,9 @@ class KernelPHash(Kernel):
         return self.equivalent
 
     def generate_hash(self, buffer):
+        import imagehash
+        from PIL import Image
+
         buffer.seek(0)
         data = Image.open(buffer)
         phash = imagehash.phash(
@@ -211,6 +222,9 @@ class KernelPHash(Kernel):
         super().update_summary(summary)
         summary["hamming_distance"] = self.hamming_distance
         summary["hamming_tolerance"] = self.hamming_tolerance
+        # The kernel is shared by all tests, so don't carry over this result.
+        self.equivalent = None
+        self.hamming_distance = None
 
     @property
     def metadata(self):
@@ -30,25 +30,42 @@
 
 import io
 import os
+import copy
 import json
+import time
 import shutil
 import hashlib
+import inspect
 import logging
 import tempfile
 import warnings
 import contextlib
 from pathlib import Path
-from urllib.request import urlopen
+from collections import OrderedDict, deque
+from urllib.request import urlopen, getproxies
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import wait as wait_futures
 
 import pytest
 
-from pytest_mpl.summary.html import generate_summary_basic_html, generate_summary_html
+from pytest_mpl.cache import BaselineCache, KeepAliveOpener, _atomic_write, is_network_error
+from pytest_mpl.converters import ConverterPool
+from pytest_mpl.hash_library import (HASH_LIBRARY_METADATA_KEY, is_sqlite, library_file,
+                                     read_hash_library, write_hash_library)
+from pytest_mpl.kernels import KERNEL_SHA256, kernel_factory
+from pytest_mpl.summary.jsonl import ResultsWriter, generate_summary_json, read_results
 
 DEFAULT_STYLE = "classic"
 DEFAULT_TOLERANCE = 2
 DEFAULT_BACKEND = "agg"
+DEFAULT_DOWNLOAD_WORKERS = 8
+DEFAULT_COMPARISON_WORKERS = 0
+DEFAULT_KERNEL = KERNEL_SHA256
 
-SUPPORTED_FORMATS = {"html", "json", "basic-html"}
+#: Key in the pytest cache of the fingerprints of the tests which passed.
+FINGERPRINTS_CACHE_KEY = "mpl/fingerprints"
+
+SUPPORTED_FORMATS = {"html", "json", "basic-html", "lazy-html"}
 
 SHAPE_MISMATCH_ERROR = """Error: Image dimensions did not match.
   Expected shape: {expected_shape}
@@ -56,22 +73,87 @@ SHAPE_MISMATCH_ERROR = """Error: Image dimensions did not match.
   Actual shape: {actual_shape}
     {actual_path}"""
 
+#: Phases of a figure test whose durations are recorded in its summary.
+TIMING_PHASES = ('test', 'savefig', 'hashing', 'baseline', 'comparison', 'results_dir')
+
 # The following are the subsets of formats supported by the Matplotlib image
 # comparison machinery
 RASTER_IMAGE_FORMATS = ['png']
 VECTOR_IMAGE_FORMATS = ['eps', 'pdf', 'svg']
 ALL_IMAGE_FORMATS = RASTER_IMAGE_FORMATS + VECTOR_IMAGE_FORMATS
 
+#: Number of conversions of vector test images to PNG which are kept in memory.
+CONVERTED_RESULTS_CACHE_SIZE = 8
+
+#: The Linux ioctl request to clone a file (``FICLONE``).
+FICLONE = 0x40049409
 
-def _hash_file(in_stream):
+
+def file_digest(filename):
+    """
+    Return the SHA-256 digest of a file, read through a memory map.
     """
-    Hashes an already opened file.
+    from pytest_mpl.comparison import map_file
+
+    with map_file(filename) as data:
+        return hashlib.sha256(data).digest()
+
+
+def reflink(src, dst):
     """
-    in_stream.seek(0)
-    buf = in_stream.read()
-    hasher = hashlib.sha256()
-    hasher.update(buf)
-    return hasher.hexdigest()
+    Create dst as a copy-on-write clone of src, if the filesystem supports it.
+
+    Returns whether the clone was created.
+    """
+    try:
+        import fcntl
+    except ImportError:  # Not available on Windows
+        return False
+    with open(str(src), 'rb') as fsrc, open(str(dst), 'wb') as fdst:
+        try:
+            fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+        except OSError:
+            cloned = False
+        else:
+            cloned = True
+    if not cloned:
+        os.unlink(str(dst))
+    return cloned
+
+
+def link_or_copy(src, dst):
+    """
+    Make dst a copy of the file src, without copying the data if possible.
+
+    The file is cloned if the filesystem supports copy-on-write, otherwise
+    it is hard linked, and it is only copied if both fail, e.g. across
+    filesystems. The directory of dst is created if needed.
+    """
+    dst = Path(dst)
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    if dst.exists():
+        dst.unlink()
+    if reflink(src, dst):
+        return
+    try:
+        os.link(str(src), str(dst))
+    except OSError:
+        shutil.copyfile(str(src), str(dst))
+
+
+def write_image(filename, data):
+    """
+    Write encoded image bytes to a file, creating its directory if needed.
+
+    An existing file is replaced rather than overwritten, since it may be
+    hard linked into a results directory.
+    """
+    filename = Path(filename)
+    filename.parent.mkdir(parents=True, exist_ok=True)
+    if filename.exists():
+        filename.unlink()
+    with open(str(filename), 'wb') as fp:
+        fp.write(data)
 
 
 def pathify(path):
@@ -91,6 +173,19 @@ def pathify(path):
     return Path(path + ext)
 
 
+def result_library_name(hash_library):
+    """
+    Return the filename of the copy of a hash library in the results
+    directory, which is always a single JSON file.
+    """
+    name = Path(hash_library).name
+    if is_sqlite(name):
+        name = Path(name).stem + '.json'
+    elif name and not Path(name).suffix:  # Sharded library
+        name += '.json'
+    return name
+
+
 def generate_test_name(item):
     """
     Generate a unique name for the hash for this test.
@@ -121,6 +216,9 @@ def wrap_figure_interceptor(plugin, item):
 
 
 def pytest_report_header(config, startdir):
+    # Matplotlib is only imported when the plugin is enabled
+    if not mpl_enabled(config):
+        return None
     import matplotlib
     import matplotlib.ft2font
     return ["Matplotlib: {0}".format(matplotlib.__version__),
@@ -149,6 +247,34 @@ def pytest_addoption(parser):
     group.addoption(f"--{option}", help=msg, action="store")
     parser.addini(option, help=msg)
 
+    msg = (
+        "directory in which to cache baseline images downloaded from URLs, "
+        "relative to location where py.test is run. Cached images are "
+        "revalidated with the server when they expire."
+    )
+    option = "mpl-baseline-cache"
+    group.addoption(f"--{option}", help=msg, action="store")
+    parser.addini(option, help=msg)
+
+    msg = (
+        "number of threads used to download remote baseline images for all "
+        "collected tests before they are run. Set to 0 to instead download "
+        "each baseline image when its test is run."
+    )
+    option = "mpl-download-workers"
+    group.addoption(f"--{option}", help=msg, action="store")
+    parser.addini(option, help=msg)
+
+    msg = (
+        "number of processes used to compare raster images with their baseline "
+        "images while the following tests run. The results of tests are reported "
+        "once their comparison has finished. Set to 0 to compare each image "
+        "before running the next test."
+    )
+    option = "mpl-comparison-workers"
+    group.addoption(f"--{option}", help=msg, action="store")
+    parser.addini(option, help=msg)
+
     msg = "interpret the baseline directory as relative to the test location."
     group.addoption("--mpl-baseline-relative", help=msg, action="store_true")
 
@@ -157,10 +283,36 @@ def pytest_addoption(parser):
     group.addoption(f"--{option}", help=msg, action="store")
     parser.addini(option, help=msg)
 
+    msg = (
+        "hashing kernel used to generate and compare image hashes. "
+        f"Supported kernels are {', '.join(f'`{name}`' for name in kernel_factory)}."
+    )
+    option = "mpl-kernel"
+    group.addoption(f"--{option}", help=msg, action="store")
+    parser.addini(option, help=msg)
+
+    msg = "hash size (N) of the `phash` kernel, which generates hashes of N**2 bits"
+    option = "mpl-hash-size"
+    group.addoption(f"--{option}", help=msg, action="store")
+    parser.addini(option, help=msg)
+
+    msg = (
+        "maximum number of bits by which `phash` kernel hashes may differ for a test to pass, "
+        "unless specified in the mpl_image_compare decorator"
+    )
+    option = "mpl-hamming-tolerance"
+    group.addoption(f"--{option}", help=msg, action="store")
+    parser.addini(option, help=msg)
+
+    msg = "high frequency factor of the `phash` kernel, i.e. the level of image detail hashed"
+    option = "mpl-high-freq-factor"
+    group.addoption(f"--{option}", help=msg, action="store")
+    parser.addini(option, help=msg)
+
     msg = (
         "Generate a summary report of any failed tests"
         ", in --mpl-results-path. The type of the report should be "
-        "specified. Supported types are `html`, `json` and `basic-html`. "
+        "specified. Supported types are `html`, `json`, `basic-html` and `lazy-html`. "
         "Multiple types can be specified separated by commas."
     )
     option = "mpl-generate-summary"
@@ -180,6 +332,41 @@ def pytest_addoption(parser):
     group.addoption(f"--{option}", help=msg, action="store_true")
     parser.addini(option, help=msg)
 
+    msg = (
+        "skip figure tests which passed in the previous run, unless the test "
+        "function, its mpl_image_compare options, the plugin configuration, "
+        "the versions of Matplotlib and FreeType, or its baseline image or hash "
+        "have changed since. The fingerprints of these inputs are stored in the "
+        "pytest cache."
+    )
+    option = "mpl-skip-unchanged"
+    group.addoption(f"--{option}", help=msg, action="store_true")
+    parser.addini(option, help=msg, type="bool")
+
+    msg = (
+        "show the N slowest figure tests in each phase of the image comparison "
+        "(N=0 for all), using the timings recorded in the test summaries."
+    )
+    option = "mpl-durations"
+    group.addoption(f"--{option}", help=msg, action="store", metavar="N")
+    parser.addini(option, help=msg)
+
+    msg = (
+        "apply the style and backend of figure tests once per group of consecutive "
+        "tests which share them, rather than resetting the rcParams for each test."
+    )
+    option = "mpl-group-styles"
+    group.addoption(f"--{option}", help=msg, action="store_true")
+    parser.addini(option, help=msg, type="bool")
+
+    msg = (
+        "run the figure tests after the other tests, grouped by backend, style and "
+        "output format, so that these are switched as rarely as possible."
+    )
+    option = "mpl-reorder"
+    group.addoption(f"--{option}", help=msg, action="store_true")
+    parser.addini(option, help=msg, type="bool")
+
     msg = "use fully qualified test name as the filename."
     option = "mpl-use-full-test-name"
     group.addoption(f"--{option}", help=msg, action="store_true")
@@ -201,6 +388,17 @@ def pytest_addoption(parser):
     parser.addini(option, help=msg)
 
 
+def mpl_enabled(config):
+    """
+    Whether figure tests are compared, or their baselines are generated.
+    """
+    return bool(
+        config.getoption("--mpl")
+        or config.getoption("--mpl-generate-path") is not None
+        or config.getoption("--mpl-generate-hash-library") is not None
+    )
+
+
 def pytest_configure(config):
 
     config.addinivalue_line(
@@ -208,11 +406,7 @@ def pytest_configure(config):
         "mpl_image_compare: Compares matplotlib figures against a baseline image",
     )
 
-    if (
-        config.getoption("--mpl")
-        or config.getoption("--mpl-generate-path") is not None
-        or config.getoption("--mpl-generate-hash-library") is not None
-    ):
+    if mpl_enabled(config):
 
         def get_cli_or_ini(name, default=None):
             return config.getoption(f"--{name}") or config.getini(name) or default
@@ -225,9 +419,23 @@ def pytest_configure(config):
             baseline_relative_dir = config.getoption("--mpl-baseline-path")
         else:
             baseline_relative_dir = None
+        baseline_cache = get_cli_or_ini("mpl-baseline-cache")
+        download_workers = int(get_cli_or_ini("mpl-download-workers", DEFAULT_DOWNLOAD_WORKERS))
+        comparison_workers = int(get_cli_or_ini("mpl-comparison-workers",
+                                                DEFAULT_COMPARISON_WORKERS))
         use_full_test_name = get_cli_or_ini("mpl-use-full-test-name")
+        skip_unchanged = get_cli_or_ini("mpl-skip-unchanged")
+        group_styles = get_cli_or_ini("mpl-group-styles")
+        reorder = get_cli_or_ini("mpl-reorder")
+        durations = get_cli_or_ini("mpl-durations")
+        if durations is not None:
+            durations = int(durations)
 
         hash_library = get_cli_or_ini("mpl-hash-library")
+        kernel = get_cli_or_ini("mpl-kernel", DEFAULT_KERNEL)
+        hash_size = get_cli_or_ini("mpl-hash-size")
+        hamming_tolerance = get_cli_or_ini("mpl-hamming-tolerance")
+        high_freq_factor = get_cli_or_ini("mpl-high-freq-factor")
         _hash_library_from_cli = bool(config.getoption("--mpl-hash-library"))  # for backwards compatibility
 
         default_tolerance = get_cli_or_ini("mpl-default-tolerance", DEFAULT_TOLERANCE)
@@ -253,6 +461,8 @@ def pytest_configure(config):
             baseline_dir = os.path.abspath(generate_dir)
         if results_dir is not None:
             results_dir = os.path.abspath(results_dir)
+        if baseline_cache is not None:
+            baseline_cache = os.path.abspath(baseline_cache)
         if hash_library is not None:
             # For backwards compatibility, don't make absolute if set via CLI option
             if not _hash_library_from_cli:
@@ -262,13 +472,24 @@ def pytest_configure(config):
             config,
             baseline_dir=baseline_dir,
             baseline_relative_dir=baseline_relative_dir,
+            baseline_cache=baseline_cache,
+            download_workers=download_workers,
+            comparison_workers=comparison_workers,
             generate_dir=generate_dir,
             results_dir=results_dir,
             hash_library=hash_library,
             generate_hash_library=generate_hash_lib,
+            kernel=kernel,
+            hash_size=hash_size,
+            hamming_tolerance=hamming_tolerance,
+            high_freq_factor=high_freq_factor,
             generate_summary=generate_summary,
             results_always=results_always,
             use_full_test_name=use_full_test_name,
+            skip_unchanged=skip_unchanged,
+            durations=durations,
+            group_styles=group_styles,
+            reorder=reorder,
             default_style=default_style,
             default_tolerance=default_tolerance,
             default_backend=default_backend,
@@ -293,6 +514,60 @@ def switch_backend(backend):
         yield
 
 
+class StyleGroups:
+    """
+    Apply the style and backend of figure tests once per group of consecutive
+    tests which share them, rather than once per test.
+
+    Between the tests of a group, the rcParams are restored to those of the
+    group by only resetting the parameters which have changed. Tests may
+    change lists in the rcParams in place, so the snapshot of the rcParams
+    holds copies of their values, which are compared by value.
+    """
+
+    def __init__(self):
+        self._key = None
+        self._backend = None
+        self._stack = None
+        self._snapshot = None
+
+    def apply(self, style, backend):
+        """
+        Apply a style and backend, or restore them if they are already applied.
+        """
+        import matplotlib
+        import matplotlib.pyplot as plt
+        key = (repr(style), backend.lower())  # Styles may be unhashable dicts and lists
+        if key != self._key:
+            self.close()
+            with contextlib.ExitStack() as stack:
+                stack.enter_context(plt.style.context(style, after_reset=True))
+                stack.enter_context(switch_backend(backend))
+                self._stack = stack.pop_all()
+            self._key = key
+            self._backend = backend
+            # Like `matplotlib.rc_context`, the backend is not restored
+            self._snapshot = copy.deepcopy(dict(matplotlib.rcParams.copy()))
+            del self._snapshot['backend']
+            return
+
+        rcparams = matplotlib.rcParams
+        changed = {name: value for name, value in self._snapshot.items()
+                   if dict.__getitem__(rcparams, name) != value}
+        if changed:  # The values were validated when the snapshot was taken
+            dict.update(rcparams, copy.deepcopy(changed))
+        if matplotlib.get_backend().lower() != self._backend.lower():
+            plt.switch_backend(self._backend)
+
+    def close(self):
+        """
+        Restore the style and backend from before the current group.
+        """
+        if self._stack is not None:
+            self._stack.close()
+        self._key = self._backend = self._stack = self._snapshot = None
+
+
 def close_mpl_figure(fig):
     "Close a given matplotlib Figure. Any other type of figure is ignored"
 
@@ -318,19 +593,91 @@ def path_is_not_none(apath):
     return Path(apath) if apath is not None else apath
 
 
+def timed_call(function, *args):
+    """
+    Call a function and return the time it took, in seconds, and its result.
+    """
+    start = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - start, result
+
+
+class PhaseTimer:
+    """
+    Record the time spent in each phase of a figure test.
+
+    Phases are timed exclusively, so the time spent saving a figure while
+    hashing it is only counted as saving the figure.
+    """
+
+    def __init__(self):
+        self.timings = dict.fromkeys(TIMING_PHASES, 0.0)
+        self._nested = []  # Time spent in the phases nested in each open phase
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        self._nested.append(0.0)
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.timings[name] += elapsed - self._nested.pop()
+            if self._nested:
+                self._nested[-1] += elapsed
+
+
+class DeferredComparison:
+    """
+    An image comparison which is running in the comparison pool.
+
+    Parameters
+    ----------
+    future : `concurrent.futures.Future`
+        The future of the comparison results.
+    finish : callable
+        Function which takes the comparison results, updates the test summary
+        and returns the error message if the images differ.
+    """
+
+    def __init__(self, future, finish):
+        self.future = future
+        self.finish = finish
+
+    def done(self):
+        return self.future.done()
+
+    def result(self):
+        """
+        Wait for the comparison and return its error message, or `None`.
+        """
+        return self.finish(self.future.result())
+
+
 class ImageComparison:
     def __init__(
         self,
         config,
         baseline_dir=None,
         baseline_relative_dir=None,
+        baseline_cache=None,
+        download_workers=DEFAULT_DOWNLOAD_WORKERS,
+        comparison_workers=DEFAULT_COMPARISON_WORKERS,
         generate_dir=None,
         results_dir=None,
         hash_library=None,
         generate_hash_library=None,
+        kernel=DEFAULT_KERNEL,
+        hash_size=None,
+        hamming_tolerance=None,
+        high_freq_factor=None,
         generate_summary=None,
         results_always=False,
         use_full_test_name=False,
+        skip_unchanged=False,
+        durations=None,
+        group_styles=False,
+        reorder=False,
         default_style=DEFAULT_STYLE,
         default_tolerance=DEFAULT_TOLERANCE,
         default_backend=DEFAULT_BACKEND,
@@ -339,11 +686,30 @@ class ImageComparison:
         self.config = config
         self.baseline_dir = baseline_dir
         self.baseline_relative_dir = path_is_not_none(baseline_relative_dir)
+        self.baseline_cache = path_is_not_none(baseline_cache)
+        self._baseline_cache = None
+        self.download_workers = download_workers
+        self._download_executor = None
+        self._download_opener = None
+        self._downloads = {}
+        self.comparison_workers = comparison_workers
+        self._comparison_executor = None
+        self._pending_reports = deque()
+        self._deferred_comparisons = {}
         self.generate_dir = path_is_not_none(generate_dir)
         self.results_dir = path_is_not_none(results_dir)
         self.hash_library = path_is_not_none(hash_library)
         self._hash_library_from_cli = _hash_library_from_cli  # for backwards compatibility
         self.generate_hash_library = path_is_not_none(generate_hash_library)
+        kernel = kernel.lower()
+        if kernel not in kernel_factory:
+            raise ValueError(f"The mpl kernel '{kernel}' is not supported, "
+                             f"choose from {sorted(kernel_factory)}.")
+        # Options of the hashing kernel, which it reads from the plugin
+        self.hash_size = hash_size
+        self.hamming_tolerance = hamming_tolerance
+        self.high_freq_factor = high_freq_factor
+        self.kernel = kernel_factory[kernel](self)
         if generate_summary:
             generate_summary = {i.lower() for i in generate_summary.split(',')}
             unsupported_formats = generate_summary - SUPPORTED_FORMATS
@@ -351,16 +717,34 @@ class ImageComparison:
                 raise ValueError(f"The mpl summary type(s) '{sorted(unsupported_formats)}' "
                                  "are not supported.")
             # When generating HTML always apply `results_always`
-            if generate_summary & {'html', 'basic-html'}:
+            if generate_summary & {'html', 'basic-html', 'lazy-html'}:
                 results_always = True
         self.generate_summary = generate_summary
         self.results_always = results_always
         self.use_full_test_name = use_full_test_name
+        # Generating baselines always runs all of the tests
+        self.skip_unchanged = (skip_unchanged and generate_dir is None
+                               and generate_hash_library is None)
+        self._fingerprints = {}
+        self._fingerprint_updates = {}
+        self._unchanged = set()
+        self.durations = durations
+        self._timer = PhaseTimer()
+        self.group_styles = group_styles
+        self._style_groups = StyleGroups() if group_styles else None
+        self.reorder = reorder
 
         self.default_style = default_style
         self.default_tolerance = default_tolerance
         self.default_backend = default_backend
 
+        # Under pytest-xdist the tests are run by worker processes, which send
+        # their results to the controller to write the hash library and summary
+        workerinput = getattr(config, 'workerinput', None)
+        self._is_xdist_worker = workerinput is not None
+        if self._is_xdist_worker and workerinput.get('mpl_results_dir'):
+            self.results_dir = Path(workerinput['mpl_results_dir'])
+
         # Generate the containing dir for all test results
         if not self.results_dir:
             self.results_dir = Path(tempfile.mkdtemp(dir=self.results_dir))
@@ -368,15 +752,38 @@ class ImageComparison:
 
         # Decide what to call the downloadable results hash library
         if self.hash_library is not None:
-            self.results_hash_library_name = self.hash_library.name
+            self.results_hash_library_name = result_library_name(self.hash_library)
         else:  # Use the first filename encountered in a `hash_library=` kwarg
             self.results_hash_library_name = None
 
         # We need global state to store all the hashes generated over the run
         self._generated_hash_library = {}
-        self._test_results = {}
         self._test_stats = None
+        # The summaries of the tests are streamed to disk as they finish,
+        # rather than kept in memory, and read back at the end of the run
+        self._results_writer = None
+        if ((self.generate_summary or self.durations is not None or self.results_always)
+                and not self._is_xdist_worker):
+            self._results_writer = ResultsWriter(self.results_dir / 'results.jsonl')
+        self._item_results = {}
+
+        # Tests are already run in parallel by pytest-xdist workers
+        if self.comparison_workers > 0 and not self._is_xdist_worker:
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+
+            # Spawn rather than fork, since the plugin may be running threads
+            self._comparison_executor = ProcessPoolExecutor(
+                max_workers=self.comparison_workers,
+                mp_context=multiprocessing.get_context('spawn'))
+        self._hash_libraries = {}
+        self._baseline_digests = {}
+        self._conversion_cache = None
+        self._converted_results = OrderedDict()
+        self._converter_pool = None
+        self._conversion_executor = None
         self.return_value = {}
+        self._rendered_figures = {}
 
         # configure a separate logger for this pluggin which is independent
         # of the options that are configured for pytest or for the code that
@@ -419,12 +826,14 @@ class ImageComparison:
 
     def make_test_results_dir(self, item):
         """
-        Generate the directory to put the results in.
+        Return the directory to put the results in.
+
+        The directory is only created once a result is written to it, so
+        that nothing is written for passing tests unless results are always
+        kept.
         """
         test_name = pathify(generate_test_name(item))
-        results_dir = self.results_dir / test_name
-        results_dir.mkdir(exist_ok=True, parents=True)
-        return results_dir
+        return self.results_dir / test_name
 
     def baseline_directory_specified(self, item):
         """
@@ -461,25 +870,255 @@ class ImageComparison:
 
         return baseline_dir
 
-    def _download_file(self, baseline, filename):
+    def get_conversion_cache(self):
+        """
+        Return the directory in which vector baseline images converted to PNG
+        are cached.
+
+        The conversions are kept in the pytest cache, so that they persist
+        between sessions, unless the cache is disabled, when they are only
+        kept for the duration of the session.
+        """
+        if self._conversion_cache is None:
+            if getattr(self.config, 'cache', None) is not None:
+                self._conversion_cache = Path(self.config.cache.mkdir('mpl-conversions'))
+            else:
+                self._conversion_cache = Path(tempfile.mkdtemp())
+        return self._conversion_cache
+
+    def convert_baseline_image(self, baseline_image):
+        """
+        Convert a vector baseline image to PNG, next to the image.
+
+        Conversions are cached by the hash of the image and of the version of
+        the converter, so each baseline image is only converted once.
+        """
+        from matplotlib.testing.compare import get_file_hash
+
+        ext = baseline_image.suffix[1:]
+        png = baseline_image.with_name(f"{baseline_image.stem}_{ext}.png")
+        cached = self.get_conversion_cache() / f"{get_file_hash(str(baseline_image))}.png"
+        if cached.exists():
+            link_or_copy(cached, png)
+        else:
+            if png.exists():  # Always convert, the baseline may be a link to an old file
+                png.unlink()
+            self.get_converter_pool().convert(baseline_image)
+            _atomic_write(cached, png.read_bytes())
+        return png
+
+    def convert_result_image(self, test_image, imgdata):
+        """
+        Convert a vector test image to PNG, next to the image.
+
+        The conversions of the most recent test images are kept in memory, so
+        identical test images, e.g. of parametrized tests, are only converted
+        once.
+        """
+        ext = test_image.suffix[1:]
+        png = test_image.with_name(f"{test_image.stem}_{ext}.png")
+        key = (ext, hashlib.sha256(imgdata).digest())
+        if key in self._converted_results:
+            self._converted_results.move_to_end(key)
+            write_image(png, self._converted_results[key])
+        else:
+            if png.exists():
+                png.unlink()
+            self.get_converter_pool().convert(test_image)
+            self._converted_results[key] = png.read_bytes()
+            if len(self._converted_results) > CONVERTED_RESULTS_CACHE_SIZE:
+                self._converted_results.popitem(last=False)
+        return png
+
+    def get_converter_pool(self):
+        """
+        Return the pool of converters of vector images to PNG.
+
+        There is one converter of each kind, unless images are compared in a
+        comparison pool, when there are as many as comparison workers.
+        """
+        if self._converter_pool is None:
+            self._converter_pool = ConverterPool(max(1, self.comparison_workers))
+        return self._converter_pool
+
+    def get_baseline_cache(self):
+        """
+        Return the cache of downloaded baseline images.
+
+        Unless a cache directory is configured, downloads are cached in a
+        temporary directory for the duration of the session.
+        """
+        if self._baseline_cache is None:
+            cache_dir = self.baseline_cache or Path(tempfile.mkdtemp())
+            self._baseline_cache = BaselineCache(cache_dir)
+        return self._baseline_cache
+
+    def _download_file(self, baseline, filename, opener=urlopen):
+        cache = self.get_baseline_cache()
         # Note that baseline can be a comma-separated list of URLs that we can
         # then treat as mirrors
-        for base_url in baseline.split(','):
+        urls = [base_url + filename for base_url in baseline.split(',')]
+        unreachable = []
+        for url in urls:
             try:
-                u = urlopen(base_url + filename)
-                content = u.read()
+                return cache.fetch(url, opener=opener)
             except Exception as e:
-                self.logger.info(f'Downloading {base_url + filename} failed: {repr(e)}')
+                self.logger.info(f'Downloading {url} failed: {repr(e)}')
+                if is_network_error(e):
+                    unreachable.append(url)
+        # Fall back to a previously downloaded copy, e.g. when offline, but
+        # not if the image was removed from the server
+        for url in unreachable:
+            cached = cache.cached(url)
+            if cached is not None:
+                self.logger.info(f'Using cached copy of {url} which could not be revalidated')
+                return cached
+        raise Exception("Could not download baseline image from any of the "
+                        "available URLs")
+
+    def prefetch_baseline_images(self, items):
+        """
+        Start downloading the remote baseline images of the given items.
+
+        Images are downloaded in a pool of `download_workers` threads, so
+        that tests only wait for their own baseline image when they are run.
+        """
+        if self.generate_dir is not None or self.download_workers < 1:
+            return
+        if self._is_xdist_worker:
+            # Workers only run some of the tests, so download on demand
+            # rather than every worker fetching every image
+            return
+        downloads = set()
+        for item in items:
+            compare = get_compare(item)
+            if compare is None:
+                continue
+            if self.hash_library or compare.kwargs.get('hash_library', None):
+                # Hash comparison only compares to a baseline image in hybrid
+                # mode, and then only on failure unless results are always kept
+                if not (self.baseline_directory_specified(item) and self.results_always):
+                    continue
+            baseline_dir = self.get_baseline_directory(item)
+            if isinstance(baseline_dir, str) and baseline_dir.startswith(('http://', 'https://')):
+                downloads.add((baseline_dir, self.generate_filename(item)))
+        if not downloads:
+            return
+
+        self.get_baseline_cache()  # Create the cache before it is shared by threads
+        # Reuse connections to the server, unless they must go through a proxy
+        self._download_opener = urlopen if getproxies() else KeepAliveOpener()
+        self._download_executor = ThreadPoolExecutor(max_workers=self.download_workers)
+        for baseline_dir, filename in sorted(downloads):
+            self._downloads[(baseline_dir, filename)] = self._download_executor.submit(
+                self._download_file, baseline_dir, filename, opener=self._download_opener)
+
+    def pytest_collection_finish(self, session):
+        if session.config.option.collectonly:  # The baseline images won't be used
+            return
+        self.prefetch_baseline_images([item for item in session.items
+                                       if item.nodeid not in self._unchanged])
+
+    def fingerprint(self, item):
+        """
+        Return a fingerprint of the inputs of a figure test.
+
+        The inputs are the source of the test function, its parameters and
+        ``mpl_image_compare`` options, the plugin configuration, the versions
+        of Matplotlib and FreeType, and the baseline image or hash. Changes to
+        any other code called by the test are not detected. Returns `None` if
+        the inputs can't be determined, e.g. if the baseline image is remote.
+        """
+        import matplotlib
+        import matplotlib.ft2font
+
+        from pytest_mpl import __version__
+
+        compare = get_compare(item)
+        try:
+            source = inspect.getsource(item.function)
+        except (OSError, TypeError):
+            return None
+
+        baselines = []
+        hash_mode = bool(self.hash_library or compare.kwargs.get('hash_library', None))
+        if hash_mode:
+            hash_library_path = self.hash_library_path(item)
+            if not library_file(hash_library_path).exists():
+                return None
+            hash_library = self.load_hash_library(hash_library_path)
+            baselines.append(hash_library.get(HASH_LIBRARY_METADATA_KEY))
+            baselines.append(hash_library.get(generate_test_name(item)))
+        if not hash_mode or self.baseline_directory_specified(item):
+            baseline_dir = self.get_baseline_directory(item)
+            if isinstance(baseline_dir, str):  # Remote baseline images
+                return None
+            baseline_image = (baseline_dir / self.generate_filename(item)).absolute()
+            if not baseline_image.exists():
+                return None
+            baselines.append(self.baseline_digest(baseline_image)[1].hex())
+
+        callspec = getattr(item, 'callspec', None)
+        inputs = {
+            'source': source,
+            'params': repr(callspec.params) if callspec is not None else None,
+            'kwargs': repr(sorted(compare.kwargs.items())),
+            'config': [self.default_style, self.default_tolerance, self.default_backend,
+                       self.kernel.metadata, self.use_full_test_name, self.results_always],
+            'versions': [__version__, matplotlib.__version__,
+                         matplotlib.ft2font.__freetype_version__],
+            'baselines': baselines,
+        }
+        inputs = json.dumps(inputs, sort_keys=True, default=repr).encode('utf-8')
+        return hashlib.sha256(inputs).hexdigest()
+
+    def style_group(self, item):
+        """
+        Return the backend, style and output format of a figure test.
+        """
+        compare = get_compare(item)
+        backend = compare.kwargs.get('backend', self.default_backend).lower()
+        style = repr(compare.kwargs.get('style', self.default_style))
+        return backend, style, self._file_extension(item)
+
+    def reorder_items(self, items):
+        """
+        Run the other tests first, and then the figure tests grouped by backend,
+        style and output format.
+
+        The groups are in the order of their first test, and the tests of each
+        group stay in their collected order.
+        """
+        groups = {}
+        other_items = []
+        for item in items:
+            if get_compare(item) is None:
+                other_items.append(item)
             else:
-                break
-        else:
-            raise Exception("Could not download baseline image from any of the "
-                            "available URLs")
-        result_dir = Path(tempfile.mkdtemp())
-        filename = result_dir / 'downloaded'
-        with open(str(filename), 'wb') as tmpfile:
-            tmpfile.write(content)
-        return Path(filename)
+                groups.setdefault(self.style_group(item), []).append(item)
+        items[:] = other_items + [item for group in groups.values() for item in group]
+
+    def pytest_collection_modifyitems(self, session, config, items):
+        """
+        Skip the figure tests which passed with the same inputs in the previous
+        run, and group the figure tests by backend and style if requested.
+        """
+        if self.reorder:
+            self.reorder_items(items)
+        if not self.skip_unchanged or getattr(config, 'cache', None) is None:
+            return
+        previous = config.cache.get(FINGERPRINTS_CACHE_KEY, {})
+        reason = "Figure test passed with the same inputs in the previous run."
+        for item in items:
+            if get_compare(item) is None:
+                continue
+            fingerprint = self.fingerprint(item)
+            if fingerprint is None:
+                continue
+            self._fingerprints[item.nodeid] = fingerprint
+            if previous.get(item.nodeid) == fingerprint:
+                self._unchanged.add(item.nodeid)
+                item.add_marker(pytest.mark.skip(reason=reason))
 
     def obtain_baseline_image(self, item, target_dir):
         """
@@ -488,6 +1127,10 @@ class ImageComparison:
         If the image is remote it is downloaded, if it is local it is copied to
         ensure it is kept in the event of a test failure.
         """
+        with self._timer.phase('baseline'):
+            return self._obtain_baseline_image(item)
+
+    def _obtain_baseline_image(self, item):
         filename = self.generate_filename(item)
         baseline_dir = self.get_baseline_directory(item)
         baseline_remote = (isinstance(baseline_dir, str) and  # noqa
@@ -495,7 +1138,11 @@ class ImageComparison:
         if baseline_remote:
             # baseline_dir can be a list of URLs when remote, so we have to
             # pass base and filename to download
-            baseline_image = self._download_file(baseline_dir, filename)
+            download = self._downloads.get((baseline_dir, filename))
+            if download is not None:  # Wait for the prefetched image
+                baseline_image = download.result()
+            else:
+                baseline_image = self._download_file(baseline_dir, filename)
         else:
             baseline_image = (baseline_dir / filename).absolute()
 
@@ -511,32 +1158,41 @@ class ImageComparison:
 
         baseline_filename = self.generate_filename(item)
         baseline_path = (self.generate_dir / baseline_filename).absolute()
-        self.save_figure(item, fig, baseline_path)
+        imgdata = self.render_figure(item, fig)
+        with self._timer.phase('baseline'):
+            write_image(baseline_path, imgdata)
         close_mpl_figure(fig)
 
         return baseline_path
 
     def generate_image_hash(self, item, fig):
         """
-        For a `matplotlib.figure.Figure`, returns the SHA256 hash as a hexadecimal
-        string.
+        For a `matplotlib.figure.Figure`, returns the hash generated by the
+        hashing kernel as a hexadecimal string.
         """
-
-        imgdata = io.BytesIO()
-        self.save_figure(item, fig, imgdata)
-        out = _hash_file(imgdata)
+        ext = self._file_extension(item)
+        if self.kernel.raster_only and ext not in RASTER_IMAGE_FORMATS:
+            pytest.fail(f"The {self.kernel.name} hashing kernel can't hash .{ext} images. "
+                        f"Save the figure as .png, or use the {KERNEL_SHA256} kernel.",
+                        pytrace=False)
+
+        imgdata = io.BytesIO(self.render_figure(item, fig))
+        with self._timer.phase('hashing'):
+            out = self.kernel.generate_hash(imgdata)
         imgdata.close()
 
         close_mpl_figure(fig)
         return out
 
-    def compare_image_to_baseline(self, item, fig, result_dir, summary=None):
+    def compare_image_to_baseline(self, item, fig, result_dir, summary=None, defer=False,
+                                  save_results=False):
         """
         Compare a test image to a baseline image.
-        """
-        from matplotlib.image import imread
-        from matplotlib.testing.compare import compare_images
 
+        If ``defer`` is set and there is a comparison pool, raster images may
+        be compared in the pool, and a `DeferredComparison` is returned. If
+        ``save_results`` is set, the images are saved even if they match.
+        """
         if summary is None:
             summary = {}
 
@@ -546,9 +1202,9 @@ class ImageComparison:
         ext = self._file_extension(item)
 
         baseline_image_ref = self.obtain_baseline_image(item, result_dir)
+        imgdata = self.render_figure(item, fig)
 
         test_image = (result_dir / f"result.{ext}").absolute()
-        self.save_figure(item, fig, test_image)
 
         if ext in ['png', 'svg']:  # Use original file
             summary['result_image'] = test_image.relative_to(self.results_dir).as_posix()
@@ -556,6 +1212,8 @@ class ImageComparison:
             summary['result_image'] = (result_dir / f"result_{ext}.png").relative_to(self.results_dir).as_posix()
 
         if not os.path.exists(baseline_image_ref):
+            with self._timer.phase('results_dir'):
+                write_image(test_image, imgdata)
             summary['status'] = 'failed'
             summary['image_status'] = 'missing'
             error_message = ("Image file not found for comparison test in: \n\t"
@@ -566,36 +1224,118 @@ class ImageComparison:
             summary['status_msg'] = error_message
             return error_message
 
-        # setuptools may put the baseline images in non-accessible places,
-        # copy to our tmpdir to be sure to keep them in case of failure
+        # setuptools may put the baseline images in non-accessible places, so
+        # link or copy them to our tmpdir to be sure to keep them in case of
+        # failure. Until then, they are read in place.
         baseline_image = (result_dir / f"baseline.{ext}").absolute()
-        shutil.copyfile(baseline_image_ref, baseline_image)
+
+        # Deferred comparisons finish while later tests are timed
+        timer = self._timer
+
+        def save_images():
+            with timer.phase('results_dir'):
+                write_image(test_image, imgdata)
+                link_or_copy(baseline_image_ref, baseline_image)
 
         if ext in ['png', 'svg']:  # Use original file
             summary['baseline_image'] = baseline_image.relative_to(self.results_dir).as_posix()
         else:
             summary['baseline_image'] = (result_dir / f"baseline_{ext}.png").relative_to(self.results_dir).as_posix()
 
-        # Compare image size ourselves since the Matplotlib
-        # exception is a bit cryptic in this case and doesn't show
-        # the filenames. However imread won't work for vector graphics so we
-        # only do this for raster files.
+        summary['tolerance'] = tolerance
+
+        # Byte-identical images match without decoding either of them
+        baseline_size, baseline_digest = self.baseline_digest(baseline_image_ref)
+        with timer.phase('comparison'):
+            identical = (len(imgdata) == baseline_size
+                         and hashlib.sha256(imgdata).digest() == baseline_digest)
+        if identical:
+            if self.results_always or save_results:
+                save_images()
+            summary['status'] = 'passed'
+            summary['image_status'] = 'match'
+            summary['status_msg'] = 'Image comparison passed.'
+            return None
+
+        from pytest_mpl.comparison import compare_image_data, map_file
+
+        # Raster images are compared by our own engine, which decodes each
+        # image only once. Vector graphics are first converted to PNG by
+        # Matplotlib's converters.
+        # The images are only saved if the test fails, or if results are
+        # always kept. Vector graphics have to be saved to be converted.
         if ext in RASTER_IMAGE_FORMATS:
-            expected_shape = imread(str(baseline_image)).shape[:2]
-            actual_shape = imread(str(test_image)).shape[:2]
-            if expected_shape != actual_shape:
-                summary['status'] = 'failed'
-                summary['image_status'] = 'diff'
-                error_message = SHAPE_MISMATCH_ERROR.format(expected_path=baseline_image,
-                                                            expected_shape=expected_shape,
-                                                            actual_path=test_image,
-                                                            actual_shape=actual_shape)
-                summary['status_msg'] = error_message
-                return error_message
-
-        results = compare_images(str(baseline_image), str(test_image), tol=tolerance, in_decorator=True)
 
-        summary['tolerance'] = tolerance
+            def finish(timed_results):
+                elapsed, results = timed_results
+                timer.timings['comparison'] += elapsed
+                msg = self.update_summary_from_comparison(summary, results,
+                                                          baseline_image, test_image)
+                if msg is not None or self.results_always or save_results:
+                    save_images()
+                return msg
+
+            args = (str(baseline_image_ref), imgdata, tolerance,
+                    str(result_dir / f"result-failed-diff.{ext}"))
+            if defer and self._comparison_executor is not None:
+                return DeferredComparison(
+                    self._comparison_executor.submit(timed_call, compare_image_data, *args),
+                    finish)
+            return finish(timed_call(compare_image_data, *args))
+
+        from matplotlib.testing.compare import converter
+        if ext not in converter:  # Fail the test like `compare_images`
+            from matplotlib.testing.exceptions import ImageComparisonFailure
+            raise ImageComparisonFailure(f"Don't know how to convert .{ext} files to png")
+
+        save_images()
+        expected_png = result_dir / f"baseline_{ext}.png"
+        actual_png = result_dir / f"result_{ext}.png"
+
+        # The converters may depend on the fixtures of the test, so the images
+        # are compared before the test is torn down. With a comparison pool,
+        # the baseline image is converted in a thread while the test image is
+        # converted, since the conversions run in external processes.
+        def compare_vector_images():
+            if self._comparison_executor is not None:
+                if self._conversion_executor is None:
+                    self._conversion_executor = ThreadPoolExecutor(
+                        max_workers=self.comparison_workers)
+                self.get_conversion_cache()
+                self.get_converter_pool()
+                baseline_conversion = self._conversion_executor.submit(
+                    self.convert_baseline_image, baseline_image)
+                self.convert_result_image(test_image, imgdata)
+                baseline_conversion.result()
+            else:
+                self.convert_baseline_image(baseline_image)
+                self.convert_result_image(test_image, imgdata)
+            # The bounding boxes of EPS files may differ by a pixel after conversion
+            with map_file(actual_png) as actual_data:
+                return compare_image_data(str(expected_png), actual_data, tolerance,
+                                          str(result_dir / f"result_{ext}-failed-diff.png"),
+                                          crop=ext == 'eps')
+
+        elapsed, results = timed_call(compare_vector_images)
+        timer.timings['comparison'] += elapsed
+        return self.update_summary_from_comparison(summary, results, expected_png, actual_png)
+
+    def update_summary_from_comparison(self, summary, results, baseline_image, test_image):
+        """
+        Update the summary of a test from the results of an image comparison.
+
+        Returns the error message if the images differ, otherwise `None`.
+        """
+        if results is not None and 'expected_shape' in results:
+            # Compare image size ourselves since the error would otherwise be
+            # a bit cryptic and not show the filenames.
+            summary['status'] = 'failed'
+            summary['image_status'] = 'diff'
+            error_message = SHAPE_MISMATCH_ERROR.format(expected_path=baseline_image,
+                                                        actual_path=test_image, **results)
+            summary['status_msg'] = error_message
+            return error_message
+
         if results is None:
             summary['status'] = 'passed'
             summary['image_status'] = 'match'
@@ -604,8 +1344,9 @@ class ImageComparison:
         else:
             summary['status'] = 'failed'
             summary['image_status'] = 'diff'
-            summary['rms'] = results['rms']
+            summary['rms'] = float(results['rms'])
             summary['diff_image'] = Path(results['diff']).relative_to(self.results_dir).as_posix()
+            results = dict(results, expected=str(baseline_image), actual=str(test_image))
             template = ['Error: Image files did not match.',
                         'RMS Value: {rms}',
                         'Expected:  \n    {expected}',
@@ -617,8 +1358,44 @@ class ImageComparison:
             return error_message
 
     def load_hash_library(self, library_path):
-        with open(str(library_path)) as fp:
-            return json.load(fp)
+        """
+        Return the contents of a hash library.
+
+        Each library is only parsed once per session. The cached copy is
+        reloaded if the file, or the manifest of a sharded library, is modified.
+        """
+        with self._timer.phase('baseline'):
+            return self._load_hash_library(library_path)
+
+    def _load_hash_library(self, library_path):
+        library_path = Path(library_path).resolve()
+        mtime = library_file(library_path).stat().st_mtime_ns
+        cached = self._hash_libraries.get(library_path)
+        if cached is None or cached[0] != mtime:
+            if cached is not None and hasattr(cached[1], 'close'):  # Replaced SQLite library
+                cached[1].close()
+            cached = (mtime, read_hash_library(library_path))
+            self._hash_libraries[library_path] = cached
+        return cached[1]
+
+    def baseline_digest(self, baseline_image):
+        """
+        Return the size and SHA-256 digest of a baseline image.
+
+        The digest is cached for the session, and recalculated if the file
+        is modified.
+        """
+        with self._timer.phase('baseline'):
+            return self._baseline_digest(baseline_image)
+
+    def _baseline_digest(self, baseline_image):
+        stat = os.stat(str(baseline_image))
+        key = (stat.st_mtime_ns, stat.st_size)
+        cached = self._baseline_digests.get(baseline_image)
+        if cached is None or cached[0] != key:
+            cached = (key, file_digest(baseline_image))
+            self._baseline_digests[baseline_image] = cached
+        return stat.st_size, cached[1]
 
     def save_figure(self, item, fig, filename):
         if isinstance(filename, Path):
@@ -663,6 +1440,32 @@ class ImageComparison:
         if original_source_date_epoch is not None:
             os.environ['SOURCE_DATE_EPOCH'] = original_source_date_epoch
 
+    def render_figure(self, item, fig):
+        """
+        Return the figure encoded in the output format of the test.
+
+        The figure is only saved once per test, and the encoded bytes are
+        shared between hashing, writing result images and comparison.
+        """
+        test_name = generate_test_name(item)
+        if test_name not in self._rendered_figures:
+            imgdata = io.BytesIO()
+            with self._timer.phase('savefig'):
+                self.save_figure(item, fig, imgdata)
+            self._rendered_figures[test_name] = imgdata.getvalue()
+        return self._rendered_figures[test_name]
+
+    def hash_library_path(self, item):
+        """
+        Return the path to the hash library of a test.
+        """
+        compare = get_compare(item)
+        # Order of precedence for hash library: CLI, kwargs, INI (for backwards compatibility)
+        hash_library_filename = compare.kwargs.get("hash_library", None) or self.hash_library
+        if self._hash_library_from_cli:  # for backwards compatibility
+            hash_library_filename = self.hash_library
+        return (Path(item.fspath).parent / hash_library_filename).absolute()
+
     def compare_image_to_hash_library(self, item, fig, result_dir, summary=None):
         hash_comparison_pass = False
         if summary is None:
@@ -674,31 +1477,40 @@ class ImageComparison:
 
         if not self.results_hash_library_name:
             # Use hash library name of current test as results hash library name
-            self.results_hash_library_name = Path(compare.kwargs.get("hash_library", "")).name
+            self.results_hash_library_name = result_library_name(
+                compare.kwargs.get("hash_library", ""))
 
-        # Order of precedence for hash library: CLI, kwargs, INI (for backwards compatibility)
-        hash_library_filename = compare.kwargs.get("hash_library", None) or self.hash_library
-        if self._hash_library_from_cli:  # for backwards compatibility
-            hash_library_filename = self.hash_library
-        hash_library_filename = (Path(item.fspath).parent / hash_library_filename).absolute()
+        hash_library_filename = self.hash_library_path(item)
 
-        if not Path(hash_library_filename).exists():
+        if not library_file(hash_library_filename).exists():
             pytest.fail(f"Can't find hash library at path {hash_library_filename}")
 
         hash_library = self.load_hash_library(hash_library_filename)
+        # Libraries without metadata were generated with the SHA-256 kernel
+        metadata = hash_library.get(HASH_LIBRARY_METADATA_KEY, {})
+        kernel_metadata = metadata.get('kernel', {'name': KERNEL_SHA256})
+        if kernel_metadata != self.kernel.metadata:
+            pytest.fail(f"Hash library {hash_library_filename} was generated with kernel "
+                        f"{kernel_metadata}, but the configured kernel is {self.kernel.metadata}.",
+                        pytrace=False)
         hash_name = generate_test_name(item)
-        baseline_hash = hash_library.get(hash_name, None)
+        with self._timer.phase('baseline'):
+            baseline_hash = hash_library.get(hash_name, None)
         summary['baseline_hash'] = baseline_hash
 
         test_hash = self.generate_image_hash(item, fig)
         summary['result_hash'] = test_hash
 
+        with self._timer.phase('comparison'):
+            hash_match = (baseline_hash is not None and
+                          self.kernel.equivalent_hash(test_hash, baseline_hash, marker=compare))
+
         if baseline_hash is None:  # hash-missing
             summary['status'] = 'failed'
             summary['hash_status'] = 'missing'
             summary['status_msg'] = (f"Hash for test '{hash_name}' not found in {hash_library_filename}. "
                                      f"Generated hash is {test_hash}.")
-        elif test_hash == baseline_hash:  # hash-match
+        elif hash_match:  # hash-match
             hash_comparison_pass = True
             summary['status'] = 'passed'
             summary['hash_status'] = 'match'
@@ -706,13 +1518,18 @@ class ImageComparison:
         else:  # hash-diff
             summary['status'] = 'failed'
             summary['hash_status'] = 'diff'
-            summary['status_msg'] = (f"Hash {test_hash} doesn't match hash "
-                                     f"{baseline_hash} in library "
-                                     f"{hash_library_filename} for test {hash_name}.")
+            summary['status_msg'] = self.kernel.update_status(
+                f"Hash {test_hash} doesn't match hash "
+                f"{baseline_hash} in library "
+                f"{hash_library_filename} for test {hash_name}.")
+        self.kernel.update_summary(summary)
 
-        # Save the figure for later summary (will be removed later if not needed)
+        # Save the figure for the summary, if the test failed or results are always kept
         test_image = (result_dir / f"result.{ext}").absolute()
-        self.save_figure(item, fig, test_image)
+        if not hash_comparison_pass or self.results_always:
+            imgdata = self.render_figure(item, fig)
+            with self._timer.phase('results_dir'):
+                write_image(test_image, imgdata)
         summary['result_image'] = test_image.relative_to(self.results_dir).as_posix()
 
         # Hybrid mode (hash and image comparison)
@@ -725,8 +1542,10 @@ class ImageComparison:
             # Run image comparison
             baseline_summary = {}  # summary for image comparison to merge with hash comparison summary
             try:  # Ignore all errors as success does not influence the overall test result
-                baseline_comparison = self.compare_image_to_baseline(item, fig, result_dir,
-                                                                     summary=baseline_summary)
+                # The images are linked from the summary of the failed test
+                baseline_comparison = self.compare_image_to_baseline(
+                    item, fig, result_dir, summary=baseline_summary,
+                    save_results=not hash_comparison_pass)
             except Exception as baseline_error:  # Append to test error later
                 baseline_comparison = str(baseline_error)
             else:  # Update main summary
@@ -753,7 +1572,6 @@ class ImageComparison:
             yield
             return
 
-        import matplotlib.pyplot as plt
         try:
             from matplotlib.testing.decorators import remove_ticks_and_titles
         except ImportError:
@@ -766,21 +1584,27 @@ class ImageComparison:
 
         ext = self._file_extension(item)
 
-        with plt.style.context(style, after_reset=True), switch_backend(backend):
+        self._timer = timer = PhaseTimer()
+
+        with self.style_context(style, backend):
 
             # Run test and get figure object
             wrap_figure_interceptor(self, item)
-            yield
+            with timer.phase('test'):
+                yield
             test_name = generate_test_name(item)
             if test_name not in self.return_value:
                 # Test function did not complete successfully
                 return
             fig = self.return_value[test_name]
+            # Discard the encoded figure of any previous test
+            self._rendered_figures.clear()
 
             if remove_text:
                 remove_ticks_and_titles(fig)
 
-            result_dir = self.make_test_results_dir(item)
+            with timer.phase('results_dir'):
+                result_dir = self.make_test_results_dir(item)
 
             summary = {
                 'status': None,
@@ -794,7 +1618,9 @@ class ImageComparison:
                 'result_image': None,
                 'baseline_hash': None,
                 'result_hash': None,
+                'timings': timer.timings,
             }
+            results = {'test_name': test_name}
 
             # What we do now depends on whether we are generating the
             # reference images or simply running the test.
@@ -805,15 +1631,18 @@ class ImageComparison:
                 generate_image = self.generate_baseline_image(item, fig)
                 if self.results_always:  # Make baseline image available in HTML
                     result_image = (result_dir / f"baseline.{ext}").absolute()
-                    shutil.copy(generate_image, result_image)
+                    with timer.phase('results_dir'):
+                        link_or_copy(generate_image, result_image)
                     summary['baseline_image'] = \
                         result_image.relative_to(self.results_dir).as_posix()
 
             if self.generate_hash_library is not None:
                 summary['hash_status'] = 'generated'
                 image_hash = self.generate_image_hash(item, fig)
-                self._generated_hash_library[test_name] = image_hash
+                results['generated_hash'] = image_hash
+                self._item_results[item.nodeid] = results
                 summary['baseline_hash'] = image_hash
+                self.kernel.update_summary(summary)
 
             # Only test figures if not generating images
             if self.generate_dir is None:
@@ -823,67 +1652,302 @@ class ImageComparison:
 
                 # Compare against a baseline if specified
                 else:
-                    msg = self.compare_image_to_baseline(item, fig, result_dir, summary=summary)
+                    msg = self.compare_image_to_baseline(item, fig, result_dir, summary=summary,
+                                                         defer=True)
 
                 close_mpl_figure(fig)
 
-                if msg is None:
-                    if not self.results_always:
-                        shutil.rmtree(result_dir)
-                        for image_type in ['baseline_image', 'diff_image', 'result_image']:
-                            summary[image_type] = None  # image no longer exists
+                if isinstance(msg, DeferredComparison):
+                    # The outcome is decided when the test is reported
+                    self._deferred_comparisons[item.nodeid] = (msg, result_dir, summary)
+                elif msg is None:
+                    self.discard_results(result_dir, summary)
                 else:
-                    self._test_results[test_name] = summary
+                    results['summary'] = summary
+                    self._item_results[item.nodeid] = results
                     pytest.fail(msg, pytrace=False)
 
             close_mpl_figure(fig)
 
-            self._test_results[test_name] = summary
+            results['summary'] = summary
+            self._item_results[item.nodeid] = results
 
             if summary['status'] == 'skipped':
                 pytest.skip(summary['status_msg'])
 
+    @contextlib.contextmanager
+    def style_context(self, style, backend):
+        """
+        Apply the style and backend of a figure test while it runs.
+        """
+        if self._style_groups is not None:
+            self._style_groups.apply(style, backend)
+            yield
+            return
+        import matplotlib.pyplot as plt
+        with plt.style.context(style, after_reset=True), switch_backend(backend):
+            yield
+
+    def pytest_runtest_setup(self, item):
+        # Other tests run with the rcParams from outside of the figure tests
+        if self._style_groups is not None and get_compare(item) is None:
+            self._style_groups.close()
+
+    def discard_results(self, result_dir, summary):
+        """
+        Remove the result images of a passing test, unless they are always kept.
+        """
+        if not self.results_always:
+            if result_dir.exists():
+                elapsed, _ = timed_call(shutil.rmtree, result_dir)
+                summary['timings']['results_dir'] += elapsed
+            for image_type in ['baseline_image', 'diff_image', 'result_image']:
+                summary[image_type] = None  # image no longer exists
+
+    def pytest_sessionstart(self, session):
+        """
+        Compare images before the next test runs if another plugin runs the tests.
+        """
+        if self._comparison_executor is None:
+            return
+        # Plugins like pytest-rerunfailures implement the protocol themselves,
+        # which pytest-mpl would silently override
+        hook = session.config.pluginmanager.hook.pytest_runtest_protocol
+        others = sorted(impl.plugin_name for impl in hook.get_hookimpls()
+                        if not (impl.hookwrapper or getattr(impl, 'wrapper', False))
+                        and impl.plugin is not self and impl.plugin_name != 'runner')
+        if others:
+            session.config.issue_config_time_warning(pytest.PytestConfigWarning(
+                f"Ignoring --mpl-comparison-workers, since the tests are run by "
+                f"{', '.join(others)}."), stacklevel=2)
+            self._comparison_executor.shutdown(wait=False)
+            self._comparison_executor = None
+
+    @pytest.hookimpl(tryfirst=True)
+    def pytest_runtest_protocol(self, item, nextitem):
+        """
+        Run a test, but only report it once its image comparison has finished.
+
+        This is only used with a comparison pool, so that the following tests
+        run while images are being compared. Tests are reported in order.
+        """
+        if self._comparison_executor is None:
+            return None
+        from _pytest.runner import runtestprotocol
+        reports = runtestprotocol(item, nextitem=nextitem, log=False)
+        self._pending_reports.append((item, reports))
+        # Bound the number of queued comparisons by waiting for the oldest
+        if len(self._deferred_comparisons) > 2 * self.comparison_workers:
+            oldest = next(iter(self._deferred_comparisons.values()))[0]
+            wait_futures([oldest.future])
+        self.log_pending_reports()
+        return True
+
+    @pytest.hookimpl(hookwrapper=True)
+    def pytest_runtestloop(self, session):
+        yield
+        self.log_pending_reports(wait=True)
+        if self._style_groups is not None:
+            self._style_groups.close()
+
+    def log_pending_reports(self, wait=False):
+        """
+        Report the pending tests, in order, up to the first test whose image
+        comparison has not finished. If ``wait`` is set, report all of them.
+        """
+        while self._pending_reports:
+            item, reports = self._pending_reports[0]
+            deferred = self._deferred_comparisons.get(item.nodeid)
+            if deferred is not None and not deferred[0].done() and not wait:
+                break
+            self._pending_reports.popleft()
+            if deferred is not None:
+                self.finish_deferred_comparison(item, reports)
+            item.ihook.pytest_runtest_logstart(nodeid=item.nodeid, location=item.location)
+            for report in reports:
+                item.ihook.pytest_runtest_logreport(report=report)
+            item.ihook.pytest_runtest_logfinish(nodeid=item.nodeid, location=item.location)
+
+    def finish_deferred_comparison(self, item, reports):
+        """
+        Decide the outcome of a test from its deferred image comparison.
+        """
+        deferred, result_dir, summary = self._deferred_comparisons.pop(item.nodeid)
+        try:
+            msg = deferred.result()
+        except Exception as e:
+            msg = f"Image comparison failed with {e!r}"
+        if msg is None:
+            self.discard_results(result_dir, summary)
+            return
+        for report in reports:
+            if report.when == 'call' and report.passed:
+                report.outcome = 'failed'
+                report.longrepr = msg
+
+    @pytest.hookimpl(hookwrapper=True)
+    def pytest_runtest_makereport(self, item, call):
+        """
+        Attach the results of the figure test to its report.
+
+        pytest-xdist serializes the attribute with the report, so that the
+        results of tests run by workers reach the controller.
+        """
+        outcome = yield
+        results = self._item_results.pop(item.nodeid, None)
+        if results is not None:
+            results['hash_library_name'] = self.results_hash_library_name
+            results['fingerprint'] = self._fingerprints.get(item.nodeid)
+            outcome.get_result().mpl_results = results
+
+    def pytest_runtest_logreport(self, report):
+        results = getattr(report, 'mpl_results', None)
+        if results is not None:
+            self.record_results(report, **results)
+
+    def record_results(self, report, test_name, summary=None, generated_hash=None,
+                       hash_library_name=None, fingerprint=None):
+        """
+        Store the results of a figure test for the hash library and summary.
+        """
+        if fingerprint is not None:  # Only remember the inputs of passing tests
+            self._fingerprint_updates[report.nodeid] = fingerprint if report.passed else None
+        if summary is not None and self._results_writer is not None:
+            self._results_writer.write(test_name, summary)
+        if generated_hash is not None:
+            self._generated_hash_library[test_name] = generated_hash
+        if not self.results_hash_library_name:
+            self.results_hash_library_name = hash_library_name
+
+    @pytest.hookimpl(optionalhook=True)
+    def pytest_configure_node(self, node):
+        """
+        Share the results directory with pytest-xdist workers.
+        """
+        node.workerinput['mpl_results_dir'] = str(self.results_dir)
+
+    def hash_library_with_metadata(self, hashes):
+        """
+        Return a hash library of the given hashes and the kernel metadata.
+        """
+        library = {HASH_LIBRARY_METADATA_KEY: {'kernel': self.kernel.metadata}}
+        library.update(hashes)
+        return library
+
+    def read_test_results(self):
+        """
+        Read the summaries of the tests which have been streamed to disk.
+        """
+        self._results_writer.close()
+        return read_results(self._results_writer.path)
+
     def generate_summary_json(self):
-        json_file = self.results_dir / 'results.json'
-        with open(json_file, 'w') as f:
-            json.dump(self._test_results, f, indent=2)
-        return json_file
+        self._results_writer.close()
+        return generate_summary_json(self._results_writer.path, self.results_dir)
+
+    def pytest_terminal_summary(self, terminalreporter):
+        """
+        List the slowest figure tests in each phase, if ``--mpl-durations`` is set.
+        """
+        if self.durations is None or self._is_xdist_worker:
+            return
+        timings = {name: summary['timings'] for name, summary in self.read_test_results().items()
+                   if summary.get('timings')}
+        if not timings:
+            return
+        terminalreporter.write_sep("=", "slowest pytest-mpl phases")
+        for phase in TIMING_PHASES:
+            durations = sorted(((test_timings[phase], name)
+                                for name, test_timings in timings.items()
+                                if test_timings[phase] > 0), reverse=True)
+            if not durations:
+                continue
+            total = sum(duration for duration, _ in durations)
+            terminalreporter.write_line(f"{phase} ({total:.3f}s in total):")
+            for duration, name in durations[:self.durations or None]:
+                terminalreporter.write_line(f"  {duration:8.4f}s {name}")
 
     def pytest_unconfigure(self, config):
         """
         Save out the hash library at the end of the run.
         """
+        if self._download_executor is not None:
+            for download in self._downloads.values():
+                download.cancel()
+            self._download_executor.shutdown(wait=True)
+            if isinstance(self._download_opener, KeepAliveOpener):
+                self._download_opener.close()
+        if self._comparison_executor is not None:
+            self._comparison_executor.shutdown(wait=True)
+        if self._conversion_executor is not None:
+            self._conversion_executor.shutdown(wait=True)
+        if self._converter_pool is not None:
+            self._converter_pool.close()
+        for _, hash_library in self._hash_libraries.values():
+            if hasattr(hash_library, 'close'):  # SQLite hash libraries
+                hash_library.close()
+        if self._baseline_cache is not None and self.baseline_cache is None:
+            shutil.rmtree(self._baseline_cache.directory, ignore_errors=True)
+        if self._conversion_cache is not None and getattr(config, 'cache', None) is None:
+            shutil.rmtree(self._conversion_cache, ignore_errors=True)
+
+        if self._is_xdist_worker:  # The controller writes the results
+            return
+
+        if self._fingerprint_updates and getattr(config, 'cache', None) is not None:
+            fingerprints = config.cache.get(FINGERPRINTS_CACHE_KEY, {})
+            for nodeid, fingerprint in self._fingerprint_updates.items():
+                if fingerprint is None:
+                    fingerprints.pop(nodeid, None)
+                else:
+                    fingerprints[nodeid] = fingerprint
+            config.cache.set(FINGERPRINTS_CACHE_KEY, fingerprints)
+
+        test_results = {}
+        if self._results_writer is not None:
+            test_results = self.read_test_results()
+
         result_hash_library = self.results_dir / (self.results_hash_library_name or "temp.json")
         if self.generate_hash_library is not None:
             hash_library_path = Path(config.rootdir) / self.generate_hash_library
-            hash_library_path.parent.mkdir(parents=True, exist_ok=True)
-            with open(hash_library_path, "w") as fp:
-                json.dump(self._generated_hash_library, fp, indent=2)
+            library = self.hash_library_with_metadata(self._generated_hash_library)
+            write_hash_library(hash_library_path, library)
             if self.results_always:  # Make accessible in results directory
-                # Use same name as generated
-                result_hash_library = self.results_dir / hash_library_path.name
-                shutil.copy(hash_library_path, result_hash_library)
+                # Use same name as generated, as a single file
+                result_hash_library = self.results_dir / result_library_name(hash_library_path)
+                with open(result_hash_library, "w") as fp:
+                    json.dump(library, fp, indent=2)
         elif self.results_always and self.results_hash_library_name:
-            result_hashes = {k: v['result_hash'] for k, v in self._test_results.items()
+            result_hashes = {k: v['result_hash'] for k, v in test_results.items()
                              if v['result_hash']}
             if len(result_hashes) > 0:  # At least one hash comparison test
                 with open(result_hash_library, "w") as fp:
-                    json.dump(result_hashes, fp, indent=2)
+                    json.dump(self.hash_library_with_metadata(result_hashes), fp, indent=2)
 
         if self.generate_summary:
+            # Jinja and Pillow are only imported when a summary is written
+            from pytest_mpl.summary.html import (generate_summary_basic_html, generate_summary_html,
+                                                 generate_summary_lazy_html, generate_thumbnails)
+
             kwargs = {}
             if 'json' in self.generate_summary:
                 summary = self.generate_summary_json()
                 print(f"A JSON report can be found at: {summary}")
             if result_hash_library.exists():  # link to it in the HTML
                 kwargs["hash_library"] = result_hash_library.name
+            if self.generate_summary & {'html', 'basic-html', 'lazy-html'}:
+                kwargs["thumbnails"] = generate_thumbnails(test_results, self.results_dir)
             if 'html' in self.generate_summary:
-                summary = generate_summary_html(self._test_results, self.results_dir, **kwargs)
+                summary = generate_summary_html(test_results, self.results_dir, **kwargs)
                 print(f"A summary of test results can be found at: {summary}")
             if 'basic-html' in self.generate_summary:
-                summary = generate_summary_basic_html(self._test_results, self.results_dir,
+                summary = generate_summary_basic_html(test_results, self.results_dir,
                                                       **kwargs)
                 print(f"A summary of test results can be found at: {summary}")
+            if 'lazy-html' in self.generate_summary:
+                summary = generate_summary_lazy_html(test_results, self.results_dir,
+                                                     **kwargs)
+                print(f"A summary of test results can be found at: {summary}")
 
 
 class FigureCloser:
@@ -1,15 +1,26 @@
 import os
 import sys
+import json
 import shutil
+from pathlib import Path
+from functools import lru_cache
+from urllib.parse import quote
+from concurrent.futures import ThreadPoolExecutor
 
 if sys.version_info >= (3, 8):
     from functools import cached_property
 else:
     cached_property = property
 
-from jinja2 import Environment, PackageLoader, select_autoescape
+from jinja2 import Environment, FileSystemBytecodeCache, PackageLoader, select_autoescape
 
-__all__ = ['generate_summary_html', 'generate_summary_basic_html']
+__all__ = ['generate_summary_html', 'generate_summary_basic_html', 'generate_summary_lazy_html',
+           'generate_thumbnails']
+
+#: Maximum width and height of the thumbnails of the images shown in result cards.
+THUMBNAIL_SIZE = (400, 400)
+
+IMAGE_KEYS = ['baseline_image', 'diff_image', 'result_image']
 
 
 class Results:
@@ -19,11 +30,13 @@ class Results:
     Parameters
     ----------
     results : dict
-        The `pytest_mpl.plugin.ImageComparison._test_results` object.
+        The summaries of the tests, as read by `pytest_mpl.summary.jsonl.read_results`.
     title : str
         Value for HTML <title>.
+    thumbnails : dict, optional
+        Paths of the thumbnails of the images, from `generate_thumbnails`.
     """
-    def __init__(self, results, title="Image comparison"):
+    def __init__(self, results, title="Image comparison", thumbnails=None):
         self.title = title  # HTML <title>
 
         # Generate sorted list of results
@@ -31,7 +44,7 @@ class Results:
         pad = len(str(len(results.items())))  # maximum length of a result index
         for collect_n, (name, item) in enumerate(results.items()):
             card_id = str(collect_n).zfill(pad)  # zero pad for alphanumerical sorting
-            self.cards += [Result(name, item, card_id)]
+            self.cards += [Result(name, item, card_id, thumbnails)]
         self.cards = sorted(self.cards, key=lambda i: i.indexes['status'], reverse=True)
 
     @cached_property
@@ -78,15 +91,18 @@ class Result:
     name : str
         Full name of the test including modules.
     item : dict
-        Dictionary of summary results for a test in
-        `pytest_mpl.plugin.ImageComparison._test_results`.
+        Dictionary of summary results for a test, as read by
+        `pytest_mpl.summary.jsonl.read_results`.
     id : str
         The test number in order collected. Numbers must be
         zero padded due to alphanumerical sorting.
+    thumbnails : dict, optional
+        Paths of the thumbnails of the images, from `generate_thumbnails`.
     """
-    def __init__(self, name, item, id):
+    def __init__(self, name, item, id, thumbnails=None):
         # Make the summary dictionary available as attributes
-        self.__dict__ = item
+        self.__dict__ = dict(item)
+        self._thumbnails = thumbnails or {}
 
         # Sort index for collection order
         self.id = id
@@ -160,6 +176,42 @@ class Result:
             ):  # Only show if different to overall status
                 yield {'status': status, 'svg': test_type, 'tooltip': status_getter(status)}
 
+    def thumbnail(self, image):
+        """Path of the thumbnail of an image, or of the image if it has none."""
+        return self._thumbnails.get(image, image)
+
+    @property
+    def data(self):
+        """Dictionary of the data used to render the result card in JavaScript."""
+        data = {
+            'id': self.id,
+            'full_name': self.full_name,
+            'module': self.module,
+            'name': self.name,
+            'classes': self.classes,
+            'indexes': self.indexes,
+            'status': self.status,
+            'status_class': status_class(self.status),
+            'status_msg': self.status_msg,
+            'badges': [dict(badge, status_class=status_class(badge['status']))
+                       for badge in self.badges],
+        }
+        for image in IMAGE_KEYS:
+            path = getattr(self, image)
+            data[image] = quote(path) if path else None  # as with Jinja's urlencode
+            data[image.replace('image', 'thumbnail')] = quote(self.thumbnail(path)) if path else None
+        if self.image_status:
+            data.update(image_status=self.image_status,
+                        image_status_class=status_class(self.image_status),
+                        image_status_msg=image_status_msg(self.image_status),
+                        rms=str(self.rms_str), tolerance=str(self.tolerance))
+        if self.hash_status:
+            data.update(hash_status=self.hash_status,
+                        hash_status_class=status_class(self.hash_status),
+                        hash_status_msg=hash_status_msg(self.hash_status),
+                        baseline_hash=self.baseline_hash, result_hash=self.result_hash)
+        return data
+
 
 def status_class(status):
     """Status to Bootstrap class."""
@@ -198,34 +250,117 @@ def hash_status_msg(status):
     return messages[status]
 
 
-def generate_summary_html(results, results_dir, hash_library=None):
+@lru_cache(maxsize=None)
+def get_environment():
+    """
+    Return the Jinja environment of the summary templates.
+
+    The environment is created once, so that templates are only compiled
+    once per process. Compiled templates are also stored in Jinja's bytecode
+    cache in the temporary directory, so that later test runs don't need to
+    compile them again.
+    """
+    try:
+        bytecode_cache = FileSystemBytecodeCache()
+    except (OSError, RuntimeError):  # No usable temporary directory
+        bytecode_cache = None
+    env = Environment(
+        loader=PackageLoader("pytest_mpl.summary.html"),
+        autoescape=select_autoescape(),
+        bytecode_cache=bytecode_cache,
+    )
+
+    # Register additional Jinja filters
+    env.filters["status_class"] = status_class
+    env.filters["image_status_msg"] = image_status_msg
+    env.filters["hash_status_msg"] = hash_status_msg
+    return env
+
+
+def _thumbnail_format():
+    """WebP if Pillow supports it, as it is much smaller, otherwise PNG."""
+    from PIL import features
+
+    return 'webp' if features.check('webp') else 'png'
+
+
+def _generate_thumbnail(results_dir, image, fmt):
+    """
+    Write a thumbnail of an image next to it, returning its path relative to
+    `results_dir`, or None if the image is small enough or isn't a PNG.
+    """
+    from PIL import Image
+
+    if not image.endswith('.png'):
+        return None
+    path = results_dir / image
+    thumbnail = path.with_name(f'{path.stem}_thumbnail.{fmt}')
+    # Reuse the thumbnail if another summary has already generated it
+    if not thumbnail.exists() or thumbnail.stat().st_mtime_ns < path.stat().st_mtime_ns:
+        with Image.open(path) as im:
+            if im.width <= THUMBNAIL_SIZE[0] and im.height <= THUMBNAIL_SIZE[1]:
+                return None
+            im.thumbnail(THUMBNAIL_SIZE)
+            im.save(thumbnail, format=fmt)
+    return thumbnail.relative_to(results_dir).as_posix()
+
+
+def generate_thumbnails(results, results_dir, max_workers=None):
+    """Generate the thumbnails of the images of the results, in parallel.
+
+    Each thumbnail is downscaled to fit within `THUMBNAIL_SIZE`, and is saved
+    next to its image. Images which already fit within it have no thumbnail.
+
+    Parameters
+    ----------
+    results : dict
+        The summaries of the tests, as read by `pytest_mpl.summary.jsonl.read_results`.
+    results_dir : Path
+        Path to the output directory.
+    max_workers : int, optional, default=None
+        Number of threads to generate the thumbnails with.
+
+    Returns
+    -------
+    dict
+        The paths of the thumbnails relative to `results_dir`, keyed by the
+        paths of their images.
+    """
+    results_dir = Path(results_dir)
+    images = sorted({summary[key] for summary in results.values()
+                     for key in IMAGE_KEYS if summary.get(key)})
+    fmt = _thumbnail_format()
+    # Pillow releases the GIL while resizing and encoding images
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        thumbnails = executor.map(lambda image: _generate_thumbnail(results_dir, image, fmt),
+                                  images)
+        return {image: thumbnail for image, thumbnail in zip(images, thumbnails)
+                if thumbnail is not None}
+
+
+def generate_summary_html(results, results_dir, hash_library=None, thumbnails=None):
     """Generate the HTML summary.
 
     Parameters
     ----------
     results : dict
-        The `pytest_mpl.plugin.ImageComparison._test_results` object.
+        The summaries of the tests, as read by `pytest_mpl.summary.jsonl.read_results`.
     results_dir : Path
         Path to the output directory.
     hash_library : str, optional, default=None
         Filename of the generated hash library at the root of `results_dir`.
         Will be linked to in HTML if not None.
+    thumbnails : dict, optional, default=None
+        Thumbnails of the images from `generate_thumbnails`, which are shown
+        in place of the full size images in the result cards.
     """
 
-    # Initialize Jinja
-    env = Environment(
-        loader=PackageLoader("pytest_mpl.summary.html"),
-        autoescape=select_autoescape()
-    )
-
-    # Register additional Jinja filters
-    env.filters["status_class"] = status_class
-    env.filters["image_status_msg"] = image_status_msg
-    env.filters["hash_status_msg"] = hash_status_msg
+    env = get_environment()
 
     # Render HTML starting from the base template
     template = env.get_template("base.html")
-    html = template.render(results=Results(results), hash_library=hash_library)
+    html = template.render(results=Results(results, thumbnails=thumbnails),
+                           hash_library=hash_library)
 
     # Write files
     for file in ['styles.css', 'extra.js', 'hash.svg', 'image.svg']:
@@ -238,29 +373,29 @@ def generate_summary_html(results, results_dir, hash_library=None):
     return html_file
 
 
-def generate_summary_basic_html(results, results_dir, hash_library=None):
+def generate_summary_basic_html(results, results_dir, hash_library=None, thumbnails=None):
     """Generate the basic HTML summary.
 
     Parameters
     ----------
     results : dict
-        The `pytest_mpl.plugin.ImageComparison._test_results` object.
+        The summaries of the tests, as read by `pytest_mpl.summary.jsonl.read_results`.
     results_dir : Path
         Path to the output directory.
     hash_library : str, optional, default=None
         Filename of the generated hash library at the root of `results_dir`.
         Will be linked to in HTML if not None.
+    thumbnails : dict, optional, default=None
+        Thumbnails of the images from `generate_thumbnails`, which are shown
+        in place of the full size images in the result cards.
     """
 
-    # Initialize Jinja
-    env = Environment(
-        loader=PackageLoader("pytest_mpl.summary.html"),
-        autoescape=select_autoescape()
-    )
+    env = get_environment()
 
     # Render HTML starting from the base template
     template = env.get_template("basic.html")
-    html = template.render(results=Results(results), hash_library=hash_library)
+    html = template.render(results=Results(results, thumbnails=thumbnails),
+                           hash_library=hash_library)
 
     # Write files
     html_file = results_dir / 'fig_comparison_basic.html'
@@ -268,3 +403,47 @@ def generate_summary_basic_html(results, results_dir, hash_library=None):
         f.write(html + '\n')
 
     return html_file
+
+
+def generate_summary_lazy_html(results, results_dir, hash_library=None, thumbnails=None):
+    """Generate the HTML summary which loads the results lazily.
+
+    The results are written to a compact ``results.js`` data file, from which
+    the page renders one page of result cards at a time, so the time taken to
+    open it doesn't grow with the number of tests.
+
+    Parameters
+    ----------
+    results : dict
+        The summaries of the tests, as read by `pytest_mpl.summary.jsonl.read_results`.
+    results_dir : Path
+        Path to the output directory.
+    hash_library : str, optional, default=None
+        Filename of the generated hash library at the root of `results_dir`.
+        Will be linked to in HTML if not None.
+    thumbnails : dict, optional, default=None
+        Thumbnails of the images from `generate_thumbnails`, which are shown
+        in place of the full size images in the result cards.
+    """
+
+    env = get_environment()
+
+    # Render HTML starting from the lazy template
+    results = Results(results, thumbnails=thumbnails)
+    template = env.get_template("lazy.html")
+    html = template.render(results=results, hash_library=hash_library)
+
+    # Write files
+    for file in ['styles.css', 'lazy.js', 'hash.svg', 'image.svg']:
+        path = os.path.join(os.path.dirname(__file__), 'templates', file)
+        shutil.copy(path, results_dir / file)
+    data = {'cards': [card.data for card in results.cards]}
+    with open(results_dir / 'results.js', 'w') as f:
+        f.write('var mplResults = ')
+        json.dump(data, f, separators=(',', ':'))
+        f.write(';\n')
+    html_file = results_dir / 'fig_comparison_lazy.html'
+    with open(html_file, 'w') as f:
+        f.write(html + '\n')
+
+    return html_file
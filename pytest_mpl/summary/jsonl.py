@@ -0,0 +1,65 @@
+import json
+
+__all__ = ['ResultsWriter', 'read_results', 'generate_summary_json']
+
+
+class ResultsWriter:
+    """
+    Append the summary of each test to a JSON Lines file as it finishes.
+
+    Each line is a JSON object with the ``test_name`` and ``summary`` of one
+    test. Lines are flushed as they are written, so the results of the tests
+    which finished are kept even if the test run crashes.
+
+    Parameters
+    ----------
+    path : Path
+        Path to the JSON Lines file, which is overwritten.
+    """
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'w', encoding='utf-8')
+
+    def write(self, test_name, summary):
+        """Append the summary of a test."""
+        self._file.write(json.dumps({'test_name': test_name, 'summary': summary}) + '\n')
+        self._file.flush()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def read_results(jsonl_file):
+    """
+    Read the test summaries from a JSON Lines file written by `ResultsWriter`.
+
+    Later summaries of a test replace earlier ones, and a final line which was
+    only partially written, e.g. because of a crash, is ignored.
+    """
+    results = {}
+    with open(jsonl_file, encoding='utf-8') as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            results[entry['test_name']] = entry['summary']
+    return results
+
+
+def generate_summary_json(jsonl_file, results_dir):
+    """Generate the JSON summary from the JSON Lines results.
+
+    Parameters
+    ----------
+    jsonl_file : Path
+        Path to the JSON Lines file written by `ResultsWriter`.
+    results_dir : Path
+        Path to the output directory.
+    """
+    json_file = results_dir / 'results.json'
+    with open(json_file, 'w') as f:
+        json.dump(read_results(jsonl_file), f, indent=2)
+    return json_file
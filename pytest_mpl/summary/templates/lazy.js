@@ -0,0 +1,377 @@
+// Render the results in `mplResults` (from results.js) one page at a time
+var pageSize = 60;
+var cards = mplResults.cards;
+var visibleCards = cards;
+var page = 0;
+var sortKey = 'status-sort';
+var sortOrder = 'desc';
+
+// Values of each result card used for sorting and searching
+var sortValues = {
+    'collected-sort': function (card) { return card.id; },
+    'test-name': function (card) { return card.full_name; },
+    'status-sort': function (card) { return card.indexes.status; },
+    'rms-sort': function (card) { return card.indexes.rms; }
+};
+for (var i = 0, card; card = cards[i++];) {
+    card.index = i - 1;
+    card.search = [card.id, card.full_name, card.indexes.status, card.indexes.rms,
+        card.classes.join(' '), card.rms, card.baseline_hash, card.result_hash].join(' ').toLowerCase();
+}
+
+var resultsList = document.getElementById('resultslist');
+var pagination = document.getElementById('pagination');
+var resultOffcanvas = document.getElementById('offcanvasResult');
+var alertPlaceholder = document.getElementById('noResultsAlert');
+var filterElements = document.getElementById('filterForm').getElementsByClassName('filter');
+
+// Enable tooltips
+enableTooltips(document);
+
+// Sort when a sort option is selected
+var sortElements = document.getElementsByClassName('sort');
+for (var i = 0, elem; elem = sortElements[i++];) {
+    elem.addEventListener('click', function () {
+        var order = this.dataset['order'];
+        if (order != 'asc' && order != 'desc') {  // Toggle the order of a repeated sort
+            order = (sortKey == this.dataset['sort'] && sortOrder == 'asc') ? 'desc' : 'asc';
+        }
+        sortResults(this.dataset['sort'], order);
+        searchParams.set('sort', sortKey);
+        searchParams.set('order', sortOrder);
+        update();
+    });
+}
+
+// Search as the query is typed
+var searchElement = document.getElementsByClassName('search')[0];
+searchElement.addEventListener('input', function () {
+    update();
+});
+
+// Get and apply initial search parameters from URL
+var searchParams = new URLSearchParams(window.location.search);
+applyURL();
+
+// Update URL when filter sidebar is hidden
+var filterOffcanvas = document.getElementById('offcanvasFilter');
+filterOffcanvas.addEventListener('hide.bs.offcanvas', function () {
+    updateURL();
+})
+
+// Update URL when search bar is clicked away from
+function searchComplete() {
+    var q = searchElement.value;
+    if (q.length > 0) {  // Include query in URL if active query
+        searchParams.set('q', q);
+    } else {
+        searchParams.delete('q');
+    }
+    updateURL();
+}
+
+// Search, sort and filter by the current URL parameters
+function applyURL() {
+    // Get and apply sort
+    var sort = searchParams.get('sort');
+    if (sort && sort in sortValues) {
+        document.getElementsByName('sort').forEach(
+            function selectSort(elem) {
+                if (elem.dataset['sort'] == sort) {
+                    elem.checked = true;
+                }
+            }
+        )
+        sortResults(sort, searchParams.get('order') == 'desc' ? 'desc' : 'asc');
+    } else {
+        sortResults(sortKey, sortOrder);
+    }
+    // Get and apply filters
+    var filters = searchParams.getAll('f');
+    var cond = searchParams.get('c');
+    if (cond === 'and') {
+        document.getElementById('conditionand').checked = true;
+    } else if (cond === 'or') {
+        document.getElementById('conditionor').checked = true;
+    }
+    for (var i = 0, f; f = filters[i++];) {
+        var elem = document.getElementById(f);
+        if (elem) {
+            elem.checked = true;
+        }
+    }
+    // Get and apply search
+    var query = searchParams.get('q');
+    if (query) {
+        searchElement.value = query;
+    }
+    // Get and show page
+    page = Math.max(parseInt(searchParams.get('p') || '1', 10) - 1, 0) || 0;
+    update(page);
+}
+
+// Update the URL with the current search parameters
+function updateURL() {
+    var query = searchParams.toString();
+    if (query.length > 0) {  // Don't end the URL with '?'
+        query = '?' + query;
+    }
+    if (window.location.search != query) {  // Update URL if changed
+        history.replaceState(null, '', window.location.pathname + query);
+    }
+}
+
+function sortResults(key, order) {
+    sortKey = key;
+    sortOrder = order;
+    var value = sortValues[key];
+    var sign = (order == 'desc') ? -1 : 1;
+    cards = cards.slice().sort(function (a, b) {
+        var va = value(a), vb = value(b);
+        if (va < vb) {
+            return -sign;
+        } else if (va > vb) {
+            return sign;
+        }
+        return a.index - b.index;  // Keep sorts stable
+    });
+}
+
+// The IDs of the selected filters, and whether all of them must match
+function selectedFilters() {
+    var filters = [];
+    for (var i = 0, elem; elem = filterElements[i++];) {
+        if (elem.checked) {
+            filters.push(elem.id);
+        }
+    }
+    return filters;
+}
+
+function matchesFilters(card, filters, cond_and) {
+    if (filters.length == 0) {
+        return true;
+    }
+    for (var i = 0, filt; filt = filters[i++];) {
+        var included = card.classes.includes(filt);
+        if (included && !cond_and) {
+            return true;
+        } else if (!included && cond_and) {
+            return false;
+        }
+    }
+    return cond_and;
+}
+
+// Search and filter the results, and show the requested page of them
+function update(newPage) {
+    var filters = selectedFilters();
+    var cond_and = document.getElementById('filterForm').elements['conditionand'].checked;
+    var query = searchElement.value.toLowerCase();
+    visibleCards = cards.filter(function (card) {
+        return matchesFilters(card, filters, cond_and) && (!query || card.search.includes(query));
+    });
+    countClasses();
+    showPage(newPage || 0);
+}
+
+function applyFilters() {
+    searchParams.delete('f');
+    searchParams.delete('c');
+    var filters = selectedFilters();
+    for (var i = 0, filt; filt = filters[i++];) {
+        searchParams.append('f', filt);
+    }
+    if (filters.length > 0) {
+        var cond_and = document.getElementById('filterForm').elements['conditionand'].checked;
+        searchParams.set('c', (cond_and) ? 'and' : 'or');
+    }
+    update();
+}
+
+function resetFilters() {
+    document.getElementById("filterForm").reset();
+    searchParams.delete('f');
+    searchParams.delete('c');
+    update();
+}
+
+function countClasses() {
+    var cond_and = document.getElementById('filterForm').elements['conditionand'].checked;
+    var itms = (cond_and) ? visibleCards : cards;
+    for (var i = 0, filt; filt = filterElements[i++];) {
+        var count = 0;
+        for (var j = 0, itm; itm = itms[j++];) {
+            if (itm.classes.includes(filt.id)) {
+                count++;
+            }
+        }
+        var badge = filt.parentElement.getElementsByClassName('badge')[0];
+        badge.innerHTML = count.toString();
+    }
+}
+
+function warnIfNone() {
+    if (visibleCards.length === 0) {  // Show info box
+        alertPlaceholder.innerHTML = '<div class="alert alert-info" role="alert">' +
+            '<h4 class="alert-heading">No tests found</h4>' +
+            '<p class="m-0">Try adjusting any active filters or searches, or ' +
+            '<a href="javascript:clearAll()" class="alert-link">clear all</a>.</p>' +
+            '</div>';
+    } else {  // Remove info box
+        alertPlaceholder.innerHTML = '';
+    }
+}
+
+// Clear active search and filters
+function clearAll() {
+    searchElement.value = '';
+    searchParams.delete('q');
+    resetFilters();
+    updateURL();
+}
+
+// Render the result cards of a page, and the links to the other pages
+function showPage(newPage) {
+    var pages = Math.max(Math.ceil(visibleCards.length / pageSize), 1);
+    page = Math.min(newPage, pages - 1);
+    if (page > 0) {
+        searchParams.set('p', page + 1);
+    } else {
+        searchParams.delete('p');
+    }
+    var html = [];
+    var pageCards = visibleCards.slice(page * pageSize, (page + 1) * pageSize);
+    for (var i = 0, card; card = pageCards[i++];) {
+        html.push(cardHTML(card));
+    }
+    resultsList.innerHTML = html.join('');
+    enableTooltips(resultsList);
+    warnIfNone();
+
+    var links = [];
+    if (pages > 1) {
+        links.push(pageLink(page - 1, 'Previous', page == 0));
+        for (var p = 0; p < pages; p++) {
+            if (p == 0 || p == pages - 1 || Math.abs(p - page) <= 2) {
+                links.push(pageLink(p, (p + 1).toString(), false, p == page));
+            } else if (Math.abs(p - page) == 3) {
+                links.push('<li class="page-item disabled"><span class="page-link">&hellip;</span></li>');
+            }
+        }
+        links.push(pageLink(page + 1, 'Next', page == pages - 1));
+    }
+    pagination.innerHTML = links.join('');
+}
+
+function changePage(newPage) {
+    showPage(newPage);
+    updateURL();
+    window.scrollTo(0, 0);
+}
+
+function pageLink(target, label, disabled, active) {
+    var classes = 'page-item' + (disabled ? ' disabled' : '') + (active ? ' active' : '');
+    return '<li class="' + classes + '"><a class="page-link" href="javascript:changePage(' +
+        target + ')">' + label + '</a></li>';
+}
+
+function enableTooltips(element) {
+    var tooltipTriggerList = [].slice.call(element.querySelectorAll('[data-bs-toggle="tooltip"]'))
+    tooltipTriggerList.map(function (tooltipTriggerEl) {
+        return new bootstrap.Tooltip(tooltipTriggerEl)
+    })
+}
+
+function escapeHTML(value) {
+    return String(value).replace(/&/g, '&amp;').replace(/</g, '&lt;').replace(/>/g, '&gt;')
+        .replace(/"/g, '&quot;').replace(/'/g, '&#39;');
+}
+
+function imageHTML(src, alt) {
+    return '<img src="' + escapeHTML(src) + '" class="card-img-top" alt="' + alt + '" loading="lazy">';
+}
+
+function cardHTML(r) {
+    var image = '';
+    if (r.image_status == 'diff') {
+        if (r.diff_image) {
+            image = '<div class="hover-image"><div class="diff-image">' + imageHTML(r.diff_thumbnail, 'diff image') +
+                '</div><div class="result-image">' + imageHTML(r.result_thumbnail, 'result image') + '</div></div>';
+        } else {
+            image = '<div class="hover-image">' + imageHTML(r.result_thumbnail, 'result image') + '</div>';
+        }
+    } else if (r.result_image) {
+        image = imageHTML(r.result_thumbnail, 'result image');
+    } else if (r.baseline_image) {
+        image = imageHTML(r.baseline_thumbnail, 'baseline image');
+    }
+    var show = ' onclick="showResult(' + r.index + ')"';
+    var badges = '';
+    for (var i = 0, badge; badge = r.badges[i++];) {
+        badges += '<button class="btn btn-sm btn-' + badge.status_class + '" type="button"' + show + '>' +
+            '<a data-bs-toggle="tooltip" data-bs-placement="top" title="' + escapeHTML(badge.tooltip) + '">' +
+            '<img src="' + badge.svg + '.svg"></a></button>';
+    }
+    return '<div class="py-2 col-sm-6 col-lg-4 col-xxl-3 result ' + r.classes.join(' ') + '">' +
+        '<div class="card">' +
+        '<a class="btn" role="button"' + show + '>' + image + '</a>' +
+        '<div class="card-body">' +
+        '<h6><small class="text-muted">' + escapeHTML(r.module) + '</small></h6>' +
+        '<h5 class="card-title">' + escapeHTML(r.name) + '</h5>' +
+        '<div class="d-flex justify-content-between align-items-center">' +
+        '<div class="btn-group status-badge" role="group" aria-label="status">' +
+        '<button class="btn btn-sm btn-' + r.status_class + '" type="button"' + show + '>' +
+        escapeHTML(r.status.toUpperCase()) + '</button>' + badges +
+        '</div></div></div></div></div>';
+}
+
+function preData(id, value, name) {
+    var cls = id.replace('_', '-');
+    return '<div class="mb-3 ' + cls + '"><label for="' + id + '" class="form-label">' + name + '</label>' +
+        '<pre class="form-control ' + cls + '-value" id="' + id + '">' + escapeHTML(value) + '</pre></div>';
+}
+
+// Show the images and details of a result in the bottom sidebar
+function showResult(index) {
+    var r = mplResults.cards[index];
+    var images = '';
+    if (r.image_status && r.image_status != 'generated') {
+        var imageCard = function (file, name) {
+            return '<div class="col py-3 m-0"><div class="card h-100">' +
+                '<div class="card-header">' + name + '</div>' +
+                (file ? imageHTML(file, name) : '') + '</div></div>';
+        };
+        images = '<div class="row row-cols-1 row-cols-md-3 g-4 mt-3">' +
+            imageCard(r.baseline_image, 'Baseline') + imageCard(r.diff_image, 'Diff') +
+            imageCard(r.result_image, 'Result') + '</div>';
+    }
+    var details = '';
+    if (r.image_status) {
+        details += '<div class="card text-white bg-' + r.image_status_class + ' mb-3">' +
+            '<div class="card-header">' + r.image_status_msg + '</div>';
+        if (r.image_status == 'match' || r.image_status == 'diff') {
+            details += '<div class="card-body">' + preData('rms', r.rms, 'RMS') +
+                preData('tolerance', r.tolerance, 'Tolerance') + '</div>';
+        }
+        details += '</div>';
+    }
+    if (r.hash_status) {
+        details += '<div class="card text-white bg-' + r.hash_status_class + ' mb-3">' +
+            '<div class="card-header">' + r.hash_status_msg + '</div>' +
+            '<div class="card-body">' + preData('baseline_hash', r.baseline_hash, 'Baseline') +
+            (r.hash_status != 'generated' ? preData('result_hash', r.result_hash, 'Result') : '') +
+            '</div></div>';
+    }
+    resultOffcanvas.innerHTML = '<div class="offcanvas-header">' +
+        '<h6><small class="text-muted">' + escapeHTML(r.module) + '</small></h6>' +
+        '<button type="button" class="btn-close text-reset" data-bs-dismiss="offcanvas" aria-label="Close"></button>' +
+        '</div><div class="offcanvas-body">' +
+        '<h5 class="card-title">' + escapeHTML(r.name) + '</h5>' + images +
+        '<div class="row row-cols-1 row-cols-md-2 g-4">' +
+        '<div class="col"><div class="card text-white bg-' + r.status_class + '">' +
+        '<div class="card-header">' + escapeHTML(r.status.toUpperCase()) + '</div>' +
+        '<div class="card-body"><pre class="card-text">' + escapeHTML(r.status_msg) + '</pre></div>' +
+        '</div></div><div class="col">' + details + '</div></div></div>';
+    bootstrap.Offcanvas.getOrCreateInstance(resultOffcanvas).show();
+}
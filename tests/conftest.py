@@ -1,3 +1,7 @@
+# pytest-mpl imports these lazily. Import them here, since in-process pytester
+# runs unload the modules which they import, and NumPy can't be imported twice
+import imagehash  # noqa: F401
+import matplotlib.pyplot  # noqa: F401
 import pytest
 from packaging.version import Version
 
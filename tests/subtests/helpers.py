@@ -75,9 +75,9 @@ def diff_summary(baseline, result, baseline_hash_library=None, result_hash_libra
             baseline_summary = replace_hash(baseline_summary, 'result_hash',
                                             result_hash_library[test])
 
-        # Get keys of recorded items
-        baseline_keys = set(baseline_summary.keys())
-        result_keys = set(result_summary.keys())
+        # Get keys of recorded items, ignoring the timings, which always differ
+        baseline_keys = set(baseline_summary.keys()) - {'timings'}
+        result_keys = set(result_summary.keys()) - {'timings'}
 
         # Summaries must have the same keys
         diff_set(baseline_keys, result_keys, error=f'Summary for {test} is not identical.')
@@ -276,6 +276,9 @@ def remove_specific_hashes(summary_file):
 
     for test in summary.keys():
 
+        # Timings are specific to each run
+        summary[test].pop("timings", None)
+
         # Get actual hashes
         baseline = summary[test]["baseline_hash"]
         result = summary[test]["result_hash"]
@@ -156,6 +156,9 @@ def run_subtest(baseline_summary_name, tmp_path, args, summaries=None, xfail=Tru
         with open(result_hash_file, "r") as f:
             result = json.load(f)
 
+        # The kernel used to generate the hashes is recorded as metadata
+        assert result.pop('pytest-mpl') == {'kernel': {'name': 'sha256'}}
+
         # Baseline contains hashes for all subtests so remove ones not used
         for test in list(baseline.keys()):
             if test not in result:
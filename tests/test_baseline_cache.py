@@ -0,0 +1,158 @@
+import threading
+from functools import partial
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+
+import pytest
+from helpers import pytester_path
+
+TEST_FILE = """
+import matplotlib.pyplot as plt
+import pytest
+@pytest.mark.parametrize("n", range({n}))
+@pytest.mark.mpl_image_compare
+def test_mpl(n):
+    fig, ax = plt.subplots()
+    ax.plot([1, n, 2])
+    return fig
+"""
+
+
+class LoggingHandler(SimpleHTTPRequestHandler):
+    cache_control = None
+    requests = None
+    clients = None
+
+    def end_headers(self):
+        if self.cache_control:
+            self.send_header("Cache-Control", self.cache_control)
+        super().end_headers()
+
+    def log_request(self, code="-", size="-"):
+        self.requests.append((self.path, int(code)))
+        self.clients.add(self.client_address)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def baseline_server(pytester):
+    """Serve generated baseline images over HTTP, recording each request."""
+    path = pytester_path(pytester)
+    pytester.makepyfile(TEST_FILE.format(n=6))
+    pytester.runpytest(f"--mpl-generate-path={path / 'baseline'}")
+    pytester.makepyfile(TEST_FILE.format(n=2))
+
+    def serve(cache_control=None, protocol_version="HTTP/1.0"):
+        handler = type("Handler", (LoggingHandler,),
+                       {"cache_control": cache_control, "protocol_version": protocol_version,
+                        "requests": [], "clients": set()})
+        server = ThreadingHTTPServer(
+            ("127.0.0.1", 0), partial(handler, directory=str(path / "baseline")))
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        servers.append(server)
+        serve.clients = handler.clients
+        return f"http://127.0.0.1:{server.server_address[1]}/", handler.requests
+
+    def stop():
+        while servers:
+            server = servers.pop()
+            server.shutdown()
+            server.server_close()
+
+    servers = []
+    serve.stop = stop
+    yield serve
+    stop()
+
+
+def test_revalidate(pytester, baseline_server):
+    path = pytester_path(pytester)
+    url, requests = baseline_server()
+    args = ["--mpl", f"--mpl-baseline-path={url}", f"--mpl-baseline-cache={path / 'cache'}"]
+
+    pytester.runpytest(*args).assert_outcomes(passed=2)
+    assert sorted(requests) == [("/test_mpl_0.png", 200), ("/test_mpl_1.png", 200)]
+    assert len(list((path / "cache" / "objects").glob("*/*"))) == 2
+
+    requests.clear()
+    pytester.runpytest(*args).assert_outcomes(passed=2)
+    assert sorted(requests) == [("/test_mpl_0.png", 304), ("/test_mpl_1.png", 304)]
+
+
+def test_fresh_entries_not_requested(pytester, baseline_server):
+    path = pytester_path(pytester)
+    url, requests = baseline_server(cache_control="max-age=3600")
+    args = ["--mpl", f"--mpl-baseline-path={url}", f"--mpl-baseline-cache={path / 'cache'}"]
+
+    pytester.runpytest(*args).assert_outcomes(passed=2)
+    assert len(requests) == 2
+
+    requests.clear()
+    pytester.runpytest(*args).assert_outcomes(passed=2)
+    assert requests == []
+
+
+def test_offline_fallback(pytester, baseline_server):
+    path = pytester_path(pytester)
+    url, requests = baseline_server()
+    args = ["--mpl", f"--mpl-baseline-path={url}", f"--mpl-baseline-cache={path / 'cache'}"]
+    pytester.runpytest(*args).assert_outcomes(passed=2)
+
+    # Stale cached images are used when the server cannot be reached
+    baseline_server.stop()
+    pytester.runpytest(*args).assert_outcomes(passed=2)
+
+
+def test_removed_baseline_not_used(pytester, baseline_server):
+    path = pytester_path(pytester)
+    url, requests = baseline_server()
+    args = ["--mpl", f"--mpl-baseline-path={url}", f"--mpl-baseline-cache={path / 'cache'}"]
+    pytester.runpytest(*args).assert_outcomes(passed=2)
+
+    # Cached images are not used once they have been removed from the server
+    (path / "baseline" / "test_mpl_0.png").unlink()
+    pytester.runpytest(*args).assert_outcomes(passed=1, failed=1)
+    assert sorted(requests[2:]) == [("/test_mpl_0.png", 404), ("/test_mpl_1.png", 304)]
+
+
+def test_temporary_cache(pytester, baseline_server):
+    url, requests = baseline_server()
+    pytester.makepyfile(
+        """
+        import matplotlib.pyplot as plt
+        import pytest
+        @pytest.mark.parametrize("n", range(3))
+        @pytest.mark.mpl_image_compare(filename="test_mpl_0.png")
+        def test_mpl(n):
+            fig, ax = plt.subplots()
+            ax.plot([1, 0, 2])
+            return fig
+        """
+    )
+    pytester.runpytest("--mpl", f"--mpl-baseline-path={url}").assert_outcomes(passed=3)
+    # Downloads are shared within the session even without a cache directory
+    assert requests == [("/test_mpl_0.png", 200)]
+
+
+@pytest.mark.parametrize("workers", [0, 2])
+def test_prefetch(pytester, baseline_server, workers):
+    url, requests = baseline_server(protocol_version="HTTP/1.1")
+    pytester.makepyfile(TEST_FILE.format(n=6))
+    result = pytester.runpytest("--mpl", f"--mpl-baseline-path={url}",
+                                f"--mpl-download-workers={workers}", "-k", "not test_mpl[5]")
+    result.assert_outcomes(passed=5, deselected=1)
+    # Only the baseline images of selected tests are downloaded
+    assert sorted(requests) == [(f"/test_mpl_{n}.png", 200) for n in range(5)]
+    if workers:  # Connections are reused by each thread
+        assert len(baseline_server.clients) <= workers
+    else:
+        assert len(baseline_server.clients) == 5
+
+
+def test_prefetch_collect_only(pytester, baseline_server):
+    url, requests = baseline_server()
+    result = pytester.runpytest("--mpl", f"--mpl-baseline-path={url}", "--collect-only")
+    assert result.ret == 0
+    assert requests == []
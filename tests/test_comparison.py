@@ -0,0 +1,105 @@
+import io
+
+import numpy as np
+import pytest
+from matplotlib.testing.compare import compare_images
+from PIL import Image
+
+from pytest_mpl.comparison import (calculate_rms, compare_arrays,
+                                   compare_image_data, crop_to_same, load_image)
+
+
+def random_image(path, mode="RGB", seed=0, size=(40, 30), opaque=False):
+    rng = np.random.default_rng(seed)
+    channels = len(mode)
+    pixels = rng.integers(0, 256, size=size[::-1] + (channels,), dtype=np.uint8)
+    if opaque and mode == "RGBA":
+        pixels[:, :, 3] = 255
+    Image.fromarray(pixels, mode=mode).save(path, format="png")
+    return path
+
+
+def perturbed_image(source, path, amount):
+    pixels = np.asarray(Image.open(source)).astype(np.int16)
+    pixels[5:15, 5:15, :3] += amount
+    Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8)).save(path, format="png")
+    return path
+
+
+@pytest.mark.parametrize("mode", ["RGB", "RGBA"])
+@pytest.mark.parametrize("amount, tol", [(0, 0), (1, 0), (5, 0.1), (5, 2), (60, 2), (60, 50)])
+def test_matches_matplotlib(tmp_path, mode, amount, tol):
+    expected = random_image(tmp_path / "expected.png", mode=mode)
+    actual = perturbed_image(expected, tmp_path / "actual.png", amount)
+
+    mpl_results = compare_images(str(expected), str(actual), tol=tol, in_decorator=True)
+    mpl_diff = tmp_path / "actual-failed-diff.png"
+    diff = tmp_path / "engine-diff.png"
+    results = compare_arrays(load_image(str(expected)), load_image(str(actual)), tol, diff)
+
+    if mpl_results is None:
+        assert results is None
+        assert not diff.exists()
+    else:
+        assert results["rms"] == pytest.approx(mpl_results["rms"])
+        assert results["tol"] == tol
+        assert results["diff"] == str(diff)
+        # Some matplotlib versions drop the (fully opaque) alpha channel of the diff
+        engine_diff = np.asarray(Image.open(diff).convert("RGB"))
+        assert np.array_equal(engine_diff, np.asarray(Image.open(mpl_diff).convert("RGB")))
+
+
+def test_opaque_rgba_equals_rgb(tmp_path):
+    rgba = random_image(tmp_path / "rgba.png", mode="RGBA", opaque=True)
+    rgb = tmp_path / "rgb.png"
+    Image.open(rgba).convert("RGB").save(rgb)
+    assert load_image(str(rgba)).shape == (30, 40, 3)
+    assert compare_arrays(load_image(str(rgba)), load_image(str(rgb)), 0, tmp_path / "d.png") is None
+
+
+def test_transparent_compared_to_rgb(tmp_path):
+    rgba = random_image(tmp_path / "rgba.png", mode="RGBA")
+    rgb = tmp_path / "rgb.png"
+    Image.open(rgba).convert("RGB").save(rgb)
+    results = compare_arrays(load_image(str(rgba)), load_image(str(rgb)), 0, tmp_path / "d.png")
+    # Only the alpha channel differs
+    alpha = np.asarray(Image.open(rgba))[:, :, 3].astype(float)
+    expected_rms = np.sqrt(((255 - alpha) ** 2).sum() / (alpha.size * 4))
+    assert results["rms"] == pytest.approx(expected_rms)
+
+
+def test_load_image_from_buffer(tmp_path):
+    path = random_image(tmp_path / "image.png")
+    with open(path, "rb") as fp:
+        buffer = io.BytesIO(fp.read())
+    assert np.array_equal(load_image(buffer), load_image(str(path)))
+
+
+def test_calculate_rms_no_overflow():
+    expected = np.zeros((2000, 2000, 4), dtype=np.uint8)
+    actual = np.full((2000, 2000, 4), 255, dtype=np.uint8)
+    assert calculate_rms(expected, actual) == 255
+
+
+def test_crop_to_same():
+    expected = np.arange(5 * 6).reshape(5, 6, 1)
+    actual = np.arange(6 * 5).reshape(6, 5, 1)
+    expected, actual = crop_to_same(expected, actual)
+    assert expected.shape == actual.shape == (5, 5, 1)
+    assert expected[0, 0, 0] == 0
+    assert actual[0, 0, 0] == 0
+
+
+@pytest.mark.parametrize("crop", [False, True])
+def test_compare_image_data_crop(tmp_path, crop):
+    expected = random_image(tmp_path / "expected.png", size=(40, 30))
+    pixels = np.asarray(Image.open(expected))
+    # The converted image has an extra row of pixels
+    buffer = io.BytesIO()
+    Image.fromarray(np.concatenate([pixels, pixels[-1:]])).save(buffer, format="png")
+    results = compare_image_data(str(expected), buffer.getvalue(), 0,
+                                 str(tmp_path / "diff.png"), crop=crop)
+    if crop:
+        assert results is None
+    else:
+        assert results == dict(expected_shape=(30, 40), actual_shape=(31, 40))
@@ -0,0 +1,100 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import matplotlib.testing.compare
+import pytest
+from PIL import Image
+
+from pytest_mpl.converters import ConverterPool
+
+
+class FakeConverter:
+    """
+    A long-lived converter, like those of Matplotlib, which records its use.
+    """
+
+    lock = threading.Lock()
+
+    def __init__(self):
+        self._proc = None
+        self.calls = 0
+        self.active = 0
+        self.closed = False
+        self.max_active = 0
+
+    def __call__(self, orig, dest):
+        with self.lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(0.02)
+        Image.new("RGB", (10, 10), "white").save(dest)
+        with self.lock:
+            self.calls += 1
+            self.active -= 1
+
+    def __del__(self):
+        self.closed = True
+
+
+@pytest.fixture
+def prototype(monkeypatch):
+    prototype = FakeConverter()
+    monkeypatch.setitem(matplotlib.testing.compare.converter, "eps", prototype)
+    return prototype
+
+
+@pytest.mark.parametrize("size", [1, 3])
+def test_parallel_conversions(tmp_path, prototype, size):
+    images = []
+    for i in range(12):
+        images.append(tmp_path / f"image{i}.eps")
+        images[-1].write_bytes(b"%!PS")
+
+    pool = ConverterPool(size)
+    with ThreadPoolExecutor(max_workers=6) as executor:
+        pngs = list(executor.map(pool.convert, images))
+    assert [png.name for png in pngs] == [f"image{i}_eps.png" for i in range(12)]
+    assert all(png.exists() for png in pngs)
+
+    # The Matplotlib converter is only used as a template for the pool
+    assert prototype.calls == 0
+    converters = pool._converters
+    assert len(converters) == size
+    assert sum(converter.calls for converter in converters) == 12
+    # Each converter process is only used by one thread at a time
+    assert all(converter.max_active == 1 for converter in converters)
+
+    pool.close()
+    assert all(converter.closed for converter in converters)
+    assert not prototype.closed
+
+
+def test_function_converter(tmp_path, monkeypatch):
+    calls = []
+
+    def convert(orig, dest):
+        calls.append(orig.name)
+        Image.new("RGB", (10, 10), "white").save(dest)
+
+    monkeypatch.setitem(matplotlib.testing.compare.converter, "eps", convert)
+    image = tmp_path / "result.eps"
+    image.write_bytes(b"%!PS")
+    pool = ConverterPool(2)
+    assert pool.convert(str(image)) == tmp_path / "result_eps.png"
+    assert calls == ["result.eps"]
+    pool.close()
+
+
+def test_converter_without_private_api(tmp_path, monkeypatch):
+    # Converters which keep a process but can't be stopped are called directly
+    prototype = FakeConverter()
+    monkeypatch.delattr(FakeConverter, "__del__")
+    monkeypatch.setitem(matplotlib.testing.compare.converter, "eps", prototype)
+    image = tmp_path / "result.eps"
+    image.write_bytes(b"%!PS")
+    pool = ConverterPool(2)
+    pool.convert(image)
+    assert prototype.calls == 1
+    assert pool._converters == []
+    pool.close()
@@ -63,3 +63,210 @@ def test_config(pytester, ini, cli, expected):
         assert "test_config.test_mpl" in raw
     else:
         assert not basic_html_summary.exists()
+
+
+def test_json_streamed(pytester, monkeypatch):
+    path = pytester_path(pytester)
+    pytester.makepyfile(
+        """
+        import os
+        import matplotlib.pyplot as plt
+        import pytest
+        @pytest.mark.mpl_image_compare
+        @pytest.mark.parametrize("i", range(2))
+        def test_mpl(i):
+            fig, ax = plt.subplots()
+            ax.plot([1, i, 3])
+            return fig
+        def test_crash():
+            if os.environ.get("CRASH"):
+                os._exit(1)
+        """
+    )
+    args = ["--mpl", f"--mpl-results-path={path}", "--mpl-generate-summary=json"]
+
+    # The summaries of the tests which finished before a crash are kept
+    monkeypatch.setenv("CRASH", "1")
+    pytester.runpytest_subprocess(*args)
+    monkeypatch.delenv("CRASH")
+    assert not (path / "results.json").exists()
+    with open(path / "results.jsonl") as fp:
+        lines = [json.loads(line) for line in fp]
+    assert [line["test_name"] for line in lines] == [
+        "test_json_streamed.test_mpl[0]", "test_json_streamed.test_mpl[1]"]
+    assert all(line["summary"]["status"] == "failed" for line in lines)
+
+    # Otherwise the lines are collected into the JSON summary
+    pytester.runpytest_subprocess(*args).assert_outcomes(failed=2, passed=1)
+    with open(path / "results.json") as fp:
+        results = json.load(fp)
+    with open(path / "results.jsonl") as fp:
+        lines = [json.loads(line) for line in fp]
+    assert results == {line["test_name"]: line["summary"] for line in lines}
+    assert sorted(results) == ["test_json_streamed.test_mpl[0]",
+                               "test_json_streamed.test_mpl[1]"]
+
+
+def test_html_streamed(pytester):
+    path = pytester_path(pytester)
+    pytester.makepyfile(
+        """
+        import matplotlib.pyplot as plt
+        import pytest
+        @pytest.mark.mpl_image_compare
+        @pytest.mark.parametrize("i", range(2))
+        def test_mpl(i):
+            fig, ax = plt.subplots()
+            ax.plot([1, i, 3])
+            return fig
+        """
+    )
+    pytester.runpytest("--mpl", f"--mpl-results-path={path}",
+                       "--mpl-generate-summary=basic-html").assert_outcomes(failed=2)
+    # The HTML summary is generated from the streamed summaries
+    with open(path / "results.jsonl") as fp:
+        names = [json.loads(line)["test_name"] for line in fp]
+    assert names == ["test_html_streamed.test_mpl[0]", "test_html_streamed.test_mpl[1]"]
+    raw = (path / "fig_comparison_basic.html").read_text()
+    assert "test_mpl[0]" in raw and "test_mpl[1]" in raw
+    assert not (path / "results.json").exists()
+
+
+def test_lazy_html(pytester):
+    path = pytester_path(pytester)
+    pytester.makepyfile(
+        """
+        import matplotlib.pyplot as plt
+        import pytest
+        @pytest.mark.mpl_image_compare
+        @pytest.mark.parametrize("i", range(3))
+        def test_mpl(i):
+            fig, ax = plt.subplots()
+            ax.plot([1, i, 3])
+            return fig
+        """
+    )
+    result = pytester.runpytest("--mpl", f"--mpl-results-path={path}",
+                                "--mpl-generate-summary=lazy-html")
+    result.assert_outcomes(failed=3)
+
+    # The page is a shell which doesn't depend on the number of tests
+    with open(path / "fig_comparison_lazy.html") as fp:
+        html = fp.read()
+    assert "test_mpl" not in html
+    assert '<script src="results.js"></script>' in html
+    for file in ["lazy.js", "styles.css", "hash.svg", "image.svg"]:
+        assert (path / file).exists()
+
+    # The results are loaded from a JavaScript data file
+    with open(path / "results.js") as fp:
+        data = fp.read()
+    prefix, suffix = "var mplResults = ", ";\n"
+    assert data.startswith(prefix) and data.endswith(suffix)
+    cards = json.loads(data[len(prefix):-len(suffix)])["cards"]
+    assert sorted(card["full_name"] for card in cards) == [
+        f"test_lazy_html.test_mpl[{i}]" for i in range(3)]
+    for card in cards:
+        assert card["status"] == "failed"
+        assert card["image_status"] == "missing"
+        assert (path / card["result_image"]).exists()
+
+
+def test_thumbnails(pytester):
+    from PIL import Image
+
+    path = pytester_path(pytester)
+    pytester.makepyfile(
+        """
+        import matplotlib.pyplot as plt
+        import pytest
+        @pytest.mark.mpl_image_compare(savefig_kwargs={'dpi': 100})
+        @pytest.mark.parametrize("figsize", [(12, 9), (3, 2)])
+        def test_mpl(figsize):
+            fig, ax = plt.subplots(figsize=figsize)
+            ax.plot([1, 2, 3])
+            return fig
+        """
+    )
+    result = pytester.runpytest("--mpl", f"--mpl-results-path={path}",
+                                "--mpl-generate-summary=html,basic-html,lazy-html")
+    result.assert_outcomes(failed=2)
+
+    # Only the large image is downscaled
+    large = "test_thumbnails.test_mpl_figsize0"
+    small = "test_thumbnails.test_mpl_figsize1"
+    thumbnails = sorted(path.glob("*/*_thumbnail.*"))
+    assert [p.relative_to(path).parent.name for p in thumbnails] == [large]
+    with Image.open(thumbnails[0]) as im:
+        assert im.size == (400, 300)
+    thumbnail = thumbnails[0].relative_to(path).as_posix()
+
+    # Result cards show the thumbnail, which links to the full size image
+    with open(path / "fig_comparison.html") as fp:
+        html = fp.read()
+    assert html.count(f'<img src="{thumbnail}"') == 1
+    assert html.count(f'<img src="{large}/result.png"') == 1  # in the detail view
+    assert f'<img src="{small}/result.png"' in html
+    with open(path / "fig_comparison_basic.html") as fp:
+        html = fp.read()
+    assert f'<a href="{large}/result.png"><img src="{thumbnail}" loading="lazy"></a>' in html
+    with open(path / "results.js") as fp:
+        data = fp.read()
+    assert f'"result_image":"{large}/result.png","result_thumbnail":"{thumbnail}"' in data
+
+
+def test_environment_cached():
+    from pytest_mpl.summary.html import get_environment
+
+    env = get_environment()
+    assert get_environment() is env
+    # Templates, including the shared ones, are only compiled once
+    assert env.get_template("navbar.html") is env.get_template("navbar.html")
+    assert env.bytecode_cache is not None
+    assert "status_class" in env.filters
+
+
+def test_timings(pytester):
+    path = pytester_path(pytester)
+    pytester.makepyfile(
+        """
+        import time
+        import matplotlib.pyplot as plt
+        import pytest
+        @pytest.mark.mpl_image_compare
+        @pytest.mark.parametrize("i", range(3))
+        def test_mpl(i):
+            time.sleep(1 if i == 1 else 0)
+            fig, ax = plt.subplots()
+            ax.plot([1, i, 3])
+            return fig
+        """
+    )
+    hash_library = path / "hashes.json"
+    pytester.runpytest(f"--mpl-generate-hash-library={hash_library}")
+    result = pytester.runpytest("--mpl", f"--mpl-hash-library={hash_library}",
+                                f"--mpl-results-path={path / 'results'}",
+                                "--mpl-generate-summary=json", "--mpl-durations=1")
+    result.assert_outcomes(passed=3)
+
+    with open(path / "results" / "results.json") as fp:
+        results = json.load(fp)
+    for name, summary in results.items():
+        timings = summary["timings"]
+        assert sorted(timings) == sorted(["test", "savefig", "hashing", "baseline",
+                                          "comparison", "results_dir"])
+        assert timings["savefig"] > 0
+        assert timings["hashing"] > 0
+        assert (timings["test"] >= 1) == name.endswith("[1]")
+
+    # Only the slowest test of each phase is listed
+    result.stdout.fnmatch_lines(["*slowest pytest-mpl phases*", "test (*s in total):",
+                                 "*s test_timings.test_mpl[[]1[]]", "savefig (*s in total):"])
+    lines = result.stdout.str().splitlines()
+    start = lines.index(next(line for line in lines if line.startswith("test (")))
+    assert lines[start + 2].startswith("savefig (")
+
+    # The table is only shown when requested
+    result = pytester.runpytest("--mpl", f"--mpl-hash-library={hash_library}")
+    result.assert_outcomes(passed=3)
+    assert "slowest pytest-mpl phases" not in result.stdout.str()
@@ -1,8 +1,14 @@
 import json
+from pathlib import Path
 
 import pytest
 from helpers import pytester_path
 
+from pytest_mpl.hash_library import (HASH_LIBRARY_METADATA_KEY, MANIFEST_NAME, is_sharded,
+                                     read_hash_library, shard_name, write_hash_library)
+
+METADATA = {'kernel': {'name': 'sha256'}}
+
 
 @pytest.mark.parametrize(
     "ini, cli, kwarg, success_expected",
@@ -48,3 +54,199 @@ def test_config(pytester, ini, cli, kwarg, success_expected):
         result.assert_outcomes(passed=1)
     else:
         result.assert_outcomes(failed=1)
+
+
+def test_parsed_once(pytester, monkeypatch):
+    path = pytester_path(pytester)
+    hash_library = path / "hash_library.json"
+    pytester.makepyfile(
+        f"""
+        import matplotlib.pyplot as plt
+        import pytest
+        @pytest.mark.parametrize("n", range(3))
+        @pytest.mark.mpl_image_compare(hash_library=r"{hash_library}")
+        def test_mpl(n):
+            fig, ax = plt.subplots()
+            ax.plot([1, n, 2])
+            return fig
+        """
+    )
+    pytester.runpytest(f"--mpl-generate-hash-library={hash_library}")
+
+    loaded = []
+    load = json.load
+
+    def counting_load(fp, *args, **kwargs):
+        loaded.append(Path(fp.name).name)
+        return load(fp, *args, **kwargs)
+
+    monkeypatch.setattr(json, "load", counting_load)
+    result = pytester.runpytest("--mpl", "-p", "no:cacheprovider")
+    result.assert_outcomes(passed=3)
+    assert loaded.count(hash_library.name) == 1
+
+
+@pytest.mark.parametrize("test_name, expected", [
+    ("test_module.test_function", "test_module"),
+    ("tests.test_module.test_function[1.5-a.b]", "tests.test_module"),
+    ("tests.test_module.TestClass.test_method", "tests.test_module.TestClass"),
+])
+def test_shard_name(test_name, expected):
+    assert shard_name(test_name) == expected
+
+
+def test_is_sharded(tmp_path):
+    assert is_sharded(tmp_path)
+    assert is_sharded(tmp_path / "hashes")
+    assert not is_sharded(tmp_path / "hashes.json")
+    # Existing files are never sharded libraries, even without an extension
+    (tmp_path / "HASHES").write_text("{}")
+    assert not is_sharded(tmp_path / "HASHES")
+
+
+def test_write_and_read(tmp_path):
+    library = {
+        HASH_LIBRARY_METADATA_KEY: METADATA,
+        "test_a.test_one": "1",
+        "test_a.test_two[x.y]": "2",
+        "test_b.TestClass.test_three": "3",
+    }
+    path = tmp_path / "hashes"
+    write_hash_library(path, library)
+    assert sorted(p.name for p in path.iterdir()) == [
+        MANIFEST_NAME, "test_a.json", "test_b.TestClass.json"]
+    with open(path / "test_a.json") as fp:
+        assert json.load(fp) == {"test_a.test_one": "1", "test_a.test_two[x.y]": "2"}
+
+    hashes = read_hash_library(path)
+    assert hashes.get(HASH_LIBRARY_METADATA_KEY) == METADATA
+    assert hashes.get("test_a.test_two[x.y]") == "2"
+    assert hashes.get("test_b.TestClass.test_three") == "3"
+    assert hashes.get("test_b.TestClass.test_four") is None
+    assert hashes.get("test_c.test_five", "missing") == "missing"
+    # Only the shards which were looked up are loaded
+    assert sorted(hashes._loaded) == ["test_a", "test_b.TestClass"]
+
+    # Single file libraries are unchanged
+    write_hash_library(tmp_path / "hashes.json", library)
+    assert read_hash_library(tmp_path / "hashes.json") == library
+
+
+def test_regenerate_shard(tmp_path):
+    path = tmp_path / "hashes"
+    write_hash_library(path, {HASH_LIBRARY_METADATA_KEY: METADATA,
+                              "test_a.test_one": "1", "test_b.test_two": "2"})
+    (path / "test_b.json").touch()
+    mtime = (path / "test_b.json").stat().st_mtime_ns
+
+    # Only the shards of the regenerated tests are rewritten
+    write_hash_library(path, {HASH_LIBRARY_METADATA_KEY: METADATA, "test_a.test_one": "3"})
+    assert (path / "test_b.json").stat().st_mtime_ns == mtime
+    hashes = read_hash_library(path)
+    assert hashes.get("test_a.test_one") == "3"
+    assert hashes.get("test_b.test_two") == "2"
+
+    # The other shards are removed if the metadata changes
+    other = {'kernel': {'name': 'phash'}}
+    write_hash_library(path, {HASH_LIBRARY_METADATA_KEY: other, "test_a.test_one": "4"})
+    assert not (path / "test_b.json").exists()
+    hashes = read_hash_library(path)
+    assert hashes.get(HASH_LIBRARY_METADATA_KEY) == other
+    assert hashes.get("test_b.test_two") is None
+
+
+def test_sqlite(tmp_path):
+    library = {HASH_LIBRARY_METADATA_KEY: METADATA, "test_a.test_one": "1", "test_a.test_two": "2"}
+    path = tmp_path / "hashes.sqlite"
+    write_hash_library(path, library)
+    hashes = read_hash_library(path)
+    assert hashes.get(HASH_LIBRARY_METADATA_KEY) == METADATA
+    assert hashes.get("test_a.test_two") == "2"
+    assert hashes.get("test_a.test_three") is None
+    assert hashes.get("test_a.test_three", "missing") == "missing"
+
+    # Libraries are replaced atomically, so existing readers are unaffected
+    write_hash_library(path, {HASH_LIBRARY_METADATA_KEY: METADATA, "test_a.test_one": "3"})
+    assert hashes.get("test_a.test_two") == "2"
+    hashes.close()
+    hashes = read_hash_library(path)
+    assert hashes.get("test_a.test_one") == "3"
+    assert hashes.get("test_a.test_two") is None
+    hashes.close()
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["hashes.sqlite"]
+
+
+def test_sqlite_library(pytester):
+    path = pytester_path(pytester)
+    pytester.makepyfile(
+        """
+        import matplotlib.pyplot as plt
+        import pytest
+        @pytest.mark.mpl_image_compare
+        @pytest.mark.parametrize("i", range(2))
+        def test_mpl(i):
+            fig, ax = plt.subplots()
+            ax.plot([1, i, 3])
+            return fig
+        """
+    )
+    hash_library = path / "hashes.db"
+    pytester.runpytest(f"--mpl-generate-hash-library={hash_library}")
+    result = pytester.runpytest("--mpl", f"--mpl-hash-library={hash_library}")
+    result.assert_outcomes(passed=2)
+
+    # The results directory has a JSON copy of the library, for the HTML summary
+    result = pytester.runpytest("--mpl", f"--mpl-hash-library={hash_library}",
+                                f"--mpl-results-path={path / 'results'}", "--mpl-results-always")
+    result.assert_outcomes(passed=2)
+    with open(path / "results" / "hashes.json") as fp:
+        hashes = json.load(fp)
+    assert sorted(hashes) == [HASH_LIBRARY_METADATA_KEY, "test_sqlite_library.test_mpl[0]",
+                              "test_sqlite_library.test_mpl[1]"]
+
+
+def test_sharded_library(pytester):
+    path = pytester_path(pytester)
+    pytester.makepyfile(
+        test_one="""
+        import matplotlib.pyplot as plt
+        import pytest
+        @pytest.mark.mpl_image_compare
+        @pytest.mark.parametrize("i", range(2))
+        def test_mpl(i):
+            fig, ax = plt.subplots()
+            ax.plot([1, i, 3])
+            return fig
+        """,
+        test_two="""
+        import matplotlib.pyplot as plt
+        import pytest
+        @pytest.mark.mpl_image_compare
+        def test_mpl():
+            fig, ax = plt.subplots()
+            ax.plot([3, 2, 1])
+            return fig
+        """,
+    )
+    hash_library = path / "hashes"
+    pytester.runpytest(f"--mpl-generate-hash-library={hash_library}")
+    with open(hash_library / MANIFEST_NAME) as fp:
+        manifest = json.load(fp)
+    assert manifest["shards"] == {"test_one": "test_one.json", "test_two": "test_two.json"}
+
+    result = pytester.runpytest("--mpl", f"--mpl-hash-library={hash_library}")
+    result.assert_outcomes(passed=3)
+
+    # A hash which differs only fails its own test
+    with open(hash_library / "test_two.json") as fp:
+        hashes = json.load(fp)
+    hashes["test_two.test_mpl"] = "0" * 64
+    with open(hash_library / "test_two.json", "w") as fp:
+        json.dump(hashes, fp)
+    result = pytester.runpytest("--mpl", f"--mpl-hash-library={hash_library}")
+    result.assert_outcomes(passed=2, failed=1)
+
+    # Regenerating one module keeps the shards of the others
+    pytester.runpytest("test_two.py", f"--mpl-generate-hash-library={hash_library}")
+    result = pytester.runpytest("--mpl", f"--mpl-hash-library={hash_library}")
+    result.assert_outcomes(passed=3)
@@ -0,0 +1,94 @@
+import json
+
+import pytest
+from helpers import pytester_path
+
+from pytest_mpl.kernels import DEFAULT_HASH_SIZE, DEFAULT_HIGH_FREQUENCY_FACTOR
+
+PYFILE = (
+    """
+    import matplotlib.pyplot as plt
+    import pytest
+    @pytest.mark.mpl_image_compare({kwargs})
+    def test_mpl():
+        fig, ax = plt.subplots()
+        ax.plot([1, 2, 3], linewidth={linewidth})
+        return fig
+    """
+)
+
+
+def generate_hash_library(pytester, *args):
+    hash_library = pytester_path(pytester) / "hash_library.json"
+    pytester.makepyfile(PYFILE.format(kwargs="", linewidth=1))
+    pytester.runpytest_subprocess(f"--mpl-generate-hash-library={hash_library}", *args)
+    with open(hash_library) as fp:
+        return hash_library, json.load(fp)
+
+
+@pytest.mark.parametrize(
+    "args, metadata, hash_length",
+    [
+        ((), {"name": "sha256"}, 64),
+        (("--mpl-kernel=phash",),
+         {"name": "phash", "hash_size": DEFAULT_HASH_SIZE,
+          "high_freq_factor": DEFAULT_HIGH_FREQUENCY_FACTOR}, 64),
+        (("--mpl-kernel=phash", "--mpl-hash-size=8", "--mpl-high-freq-factor=8"),
+         {"name": "phash", "hash_size": 8, "high_freq_factor": 8}, 16),
+    ],
+)
+def test_generate(pytester, args, metadata, hash_length):
+    hash_library, hashes = generate_hash_library(pytester, *args)
+    assert hashes.pop("pytest-mpl") == {"kernel": metadata}
+    assert len(hashes["test_generate.test_mpl"]) == hash_length
+    result = pytester.runpytest_subprocess("--mpl", f"--mpl-hash-library={hash_library}", *args)
+    result.assert_outcomes(passed=1)
+
+
+@pytest.mark.parametrize(
+    "args, kwargs, success_expected",
+    [
+        (("--mpl-kernel=sha256",), "", False),
+        (("--mpl-kernel=phash",), "", False),
+        (("--mpl-kernel=phash", "--mpl-hamming-tolerance=10"), "", True),
+        (("--mpl-kernel=phash",), "hamming_tolerance=10", True),
+        (("--mpl-kernel=phash", "--mpl-hamming-tolerance=10"), "hamming_tolerance=4", False),
+    ],
+)
+def test_hamming_tolerance(pytester, args, kwargs, success_expected):
+    hash_library, _ = generate_hash_library(pytester, *args)
+    # Line width change which alters the perceptual hash by 8 bits
+    pytester.makepyfile(PYFILE.format(kwargs=kwargs, linewidth=1.5))
+    result = pytester.runpytest_subprocess("--mpl", f"--mpl-hash-library={hash_library}", *args)
+    if success_expected:
+        result.assert_outcomes(passed=1)
+    else:
+        result.assert_outcomes(failed=1)
+        if "--mpl-kernel=phash" in args:
+            result.stdout.fnmatch_lines("*Hash hamming distance of * bits > hamming tolerance*")
+
+
+def test_kernel_mismatch(pytester):
+    hash_library, _ = generate_hash_library(pytester, "--mpl-kernel=phash")
+    result = pytester.runpytest_subprocess("--mpl", f"--mpl-hash-library={hash_library}")
+    result.assert_outcomes(failed=1)
+    result.stdout.fnmatch_lines("*was generated with kernel*phash*configured kernel is*sha256*")
+
+
+@pytest.mark.parametrize("format", ["svg", "pdf", "eps"])
+def test_phash_vector_format(pytester, format):
+    hash_library = pytester_path(pytester) / "hash_library.json"
+    pytester.makepyfile(PYFILE.format(kwargs=f"savefig_kwargs={{'format': '{format}'}}",
+                                      linewidth=1))
+    result = pytester.runpytest_subprocess(f"--mpl-generate-hash-library={hash_library}",
+                                           "--mpl-kernel=phash")
+    result.assert_outcomes(failed=1)
+    result.stdout.fnmatch_lines(f"*The phash hashing kernel can't hash .{format} images*")
+    result.stdout.no_fnmatch_line("*UnidentifiedImageError*")
+
+
+def test_unsupported_kernel(pytester):
+    pytester.makepyfile(PYFILE.format(kwargs="", linewidth=1))
+    result = pytester.runpytest_subprocess("--mpl", "--mpl-kernel=md5")
+    assert result.ret != 0
+    result.stderr.fnmatch_lines("*The mpl kernel 'md5' is not supported*")
@@ -205,6 +205,20 @@ def test_phash_update_summary(summary, distance, tolerance, count):
     assert len(summary) == count
 
 
+def test_phash_update_summary__reset():
+    kernel = KernelPHash(DummyPlugin())
+    marker = DummyMarker(hamming_tolerance=2)
+    assert kernel.equivalent_hash(HASH_BASE, HASH_4BIT, marker=marker) is False
+    summary = {}
+    kernel.update_summary(summary)
+    assert summary["hamming_distance"] == 4
+    # The result of one comparison is not reported for the next test
+    assert kernel.equivalent is None
+    assert kernel.hamming_distance is None
+    assert kernel.equivalent_hash(HASH_BASE, HASH_4BIT)
+    assert kernel.hamming_tolerance == DEFAULT_HAMMING_TOLERANCE
+
+
 @pytest.mark.parametrize(
     "hash_size,hff",
     [(DEFAULT_HASH_SIZE, DEFAULT_HIGH_FREQUENCY_FACTOR), (32, 8)],
@@ -9,9 +9,12 @@ import matplotlib
 import matplotlib.ft2font
 import matplotlib.pyplot as plt
 import pytest
+from helpers import pytester_path
 from matplotlib.testing.compare import converter
 from packaging.version import Version
 
+from pytest_mpl.plugin import link_or_copy, write_image
+
 MPL_VERSION = Version(matplotlib.__version__)
 
 baseline_dir = 'baseline'
@@ -726,3 +729,467 @@ def test_formats(pytester, use_hash_library, passes, file_format):
         result.assert_outcomes(passed=1)
     else:
         result.assert_outcomes(failed=1)
+
+
+def test_figure_saved_once(pytester):
+    path = pytester_path(pytester)
+    pytester.makepyfile(
+        f"""
+        import matplotlib.pyplot as plt
+        import pytest
+        @pytest.mark.mpl_image_compare(baseline_dir=r"{baseline_dir_abs}",
+                                       hash_library=r"{fail_hash_library}")
+        def test_hash_fails():
+            fig = plt.figure()
+            ax = fig.add_subplot(1, 1, 1)
+            ax.plot([1, 2, 2])
+            savefig = fig.savefig
+            def counting_savefig(*args, **kwargs):
+                with open(r"{path / 'savefig_calls.txt'}", "a") as fp:
+                    fp.write("savefig\\n")
+                return savefig(*args, **kwargs)
+            fig.savefig = counting_savefig
+            return fig
+        """
+    )
+    pytester.runpytest('--mpl', '--mpl-results-always',
+                       f'--mpl-generate-hash-library={path / "hashes.json"}')
+    with open(path / 'savefig_calls.txt') as fp:
+        assert fp.read().split() == ['savefig']
+
+
+@pytest.mark.parametrize('fmt', ['png', 'svg'])
+def test_identical_images_not_decoded(pytester, fmt):
+    path = pytester_path(pytester)
+    pytester.makepyfile(
+        f"""
+        import matplotlib.pyplot as plt
+        import pytest
+        @pytest.mark.mpl_image_compare(savefig_kwargs={{'format': '{fmt}'}}, deterministic=True)
+        def test_identical():
+            fig = plt.figure()
+            ax = fig.add_subplot(1, 1, 1)
+            ax.plot([1, 2, 2])
+            return fig
+        """
+    )
+    pytester.runpytest(f'--mpl-generate-path={path / "baseline"}').assert_outcomes(skipped=1)
+    pytester.makeconftest(
+        """
+        import pytest
+        def fail(*args, **kwargs):
+            raise AssertionError("images should not be decoded")
+        @pytest.fixture(autouse=True)
+        def no_decoding(monkeypatch):
+            monkeypatch.setattr("pytest_mpl.comparison.load_image", fail)
+            monkeypatch.setattr("matplotlib.testing.compare.compare_images", fail)
+        """
+    )
+    result = pytester.runpytest('--mpl', f'--mpl-baseline-path={path / "baseline"}')
+    result.assert_outcomes(passed=1)
+
+
+@pytest.mark.parametrize('workers', [0, 2])
+def test_comparison_workers(pytester, workers):
+    path = pytester_path(pytester)
+    code = """
+        import matplotlib.pyplot as plt
+        import pytest
+        @pytest.mark.mpl_image_compare(tolerance=3)
+        @pytest.mark.parametrize("i", range(6))
+        def test_mpl(i):
+            fig, ax = plt.subplots(figsize=({width}, 4))
+            ax.plot([1, 3, 2], linewidth={linewidth})
+            return fig
+        def test_plain():
+            pass
+        """
+    pytester.makepyfile(code.format(width="6", linewidth="1"))
+    pytester.runpytest_subprocess(f'--mpl-generate-path={path / "baseline"}')
+    # The figures differ by less than the tolerance for even i
+    pytester.makepyfile(code.format(width="4 if i == 5 else 6",
+                                    linewidth="1.2 if i % 2 == 0 else 5"))
+    result = pytester.runpytest_subprocess(
+        '-v', '--mpl', f'--mpl-baseline-path={path / "baseline"}',
+        f'--mpl-results-path={path / "results"}', '--mpl-generate-summary=json',
+        f'--mpl-comparison-workers={workers}')
+    result.assert_outcomes(passed=4, failed=3)
+    # Tests are reported in order
+    result.stdout.fnmatch_lines([
+        '*test_mpl?0? PASSED*', '*test_mpl?1? FAILED*', '*test_mpl?2? PASSED*',
+        '*test_mpl?3? FAILED*', '*test_mpl?4? PASSED*', '*test_mpl?5? FAILED*',
+        '*test_plain PASSED*',
+    ])
+    result.stdout.fnmatch_lines(['*Image dimensions did not match*'])
+    with open(path / 'results' / 'results.json') as fp:
+        results = json.load(fp)
+    for i in range(6):
+        summary = results[f'test_comparison_workers.test_mpl[{i}]']
+        assert summary['status'] == ('passed' if i % 2 == 0 else 'failed')
+        assert (summary['diff_image'] is not None) == (i in (1, 3))
+        assert (path / 'results' / f'test_comparison_workers.test_mpl_{i}').exists() == (i % 2 == 1)
+
+
+def test_comparison_workers_protocol_conflict(pytester):
+    pytester.makepyfile(
+        """
+        import matplotlib.pyplot as plt
+        import pytest
+        @pytest.mark.mpl_image_compare
+        @pytest.mark.parametrize("i", range(2))
+        def test_mpl(i):
+            fig, ax = plt.subplots()
+            ax.plot([1, i, 3])
+            return fig
+        """
+    )
+    pytester.makeconftest(
+        """
+        from _pytest.runner import runtestprotocol
+        def pytest_runtest_protocol(item, nextitem):
+            print("PROTOCOL:", item.name)
+            runtestprotocol(item, nextitem=nextitem)
+            return True
+        """
+    )
+    result = pytester.runpytest_subprocess("--mpl", "--mpl-comparison-workers=2", "-s")
+    # The image comparisons can't be deferred, so they are made by each test
+    result.assert_outcomes(failed=2)
+    result.stdout.fnmatch_lines(["*PROTOCOL: test_mpl[[]0[]]*", "*PROTOCOL: test_mpl[[]1[]]*",
+                                 "*Ignoring --mpl-comparison-workers, since the tests are run by*"])
+
+
+@pytest.mark.parametrize('mode', ['image', 'hash', 'hybrid'])
+def test_no_results_written_for_passing_tests(pytester, mode):
+    path = pytester_path(pytester)
+    code = """
+        import matplotlib.pyplot as plt
+        import pytest
+        @pytest.mark.mpl_image_compare
+        @pytest.mark.parametrize("i", range(2))
+        def test_mpl(i):
+            fig, ax = plt.subplots()
+            ax.plot([1, 3, 2], linewidth={linewidth})
+            return fig
+        """
+    pytester.makepyfile(code.format(linewidth="1"))
+    pytester.runpytest(f'--mpl-generate-path={path / "baseline"}',
+                       f'--mpl-generate-hash-library={path / "hashes.json"}')
+    args = ['--mpl', f'--mpl-results-path={path / "results"}']
+    if mode in ('image', 'hybrid'):
+        args.append(f'--mpl-baseline-path={path / "baseline"}')
+    if mode in ('hash', 'hybrid'):
+        args.append(f'--mpl-hash-library={path / "hashes.json"}')
+    # Only the second figure differs from its baseline, and in image mode the
+    # first figure is different but within the tolerance
+    linewidth = "1.2" if mode == 'image' else "1"
+    pytester.makepyfile(code.format(linewidth=f"{linewidth} if i == 0 else 5"))
+    pytester.makeconftest(
+        """
+        import pytest
+        def fail(*args, **kwargs):
+            raise AssertionError("no results should have been written")
+        @pytest.fixture(autouse=True)
+        def no_rmtree(monkeypatch):
+            monkeypatch.setattr("shutil.rmtree", fail)
+        """
+    )
+    result = pytester.runpytest(*args)
+    result.assert_outcomes(passed=1, failed=1)
+    assert [p.name for p in (path / 'results').iterdir()] == [
+        'test_no_results_written_for_passing_tests.test_mpl_1']
+
+
+def test_hybrid_hash_diff_saves_matching_baseline(pytester):
+    path = pytester_path(pytester)
+    pytester.makepyfile(
+        """
+        import matplotlib.pyplot as plt
+        import pytest
+        @pytest.mark.mpl_image_compare
+        def test_mpl():
+            fig, ax = plt.subplots()
+            ax.plot([1, 3, 2])
+            return fig
+        """
+    )
+    pytester.runpytest(f'--mpl-generate-path={path / "baseline"}',
+                       f'--mpl-generate-hash-library={path / "hashes.json"}')
+    hashes = json.loads((path / 'hashes.json').read_text())
+    hashes['test_hybrid_hash_diff_saves_matching_baseline.test_mpl'] = 'different'
+    (path / 'hashes.json').write_text(json.dumps(hashes))
+    result = pytester.runpytest('--mpl', f'--mpl-baseline-path={path / "baseline"}',
+                                f'--mpl-hash-library={path / "hashes.json"}',
+                                f'--mpl-results-path={path / "results"}',
+                                '--mpl-generate-summary=json')
+    result.assert_outcomes(failed=1)
+    summary, = json.loads((path / 'results' / 'results.json').read_text()).values()
+    assert summary['hash_status'] == 'diff'
+    assert summary['image_status'] == 'match'
+    # The images linked from the summary of the failed test exist
+    assert (path / 'results' / summary['baseline_image']).exists()
+    assert (path / 'results' / summary['result_image']).exists()
+    assert summary['diff_image'] is None
+
+
+def test_link_or_copy(tmp_path):
+    baseline = tmp_path / 'baseline.png'
+    write_image(baseline, b'baseline')
+    result = tmp_path / 'results' / 'test' / 'baseline.png'
+    link_or_copy(baseline, result)
+    assert result.read_bytes() == b'baseline'
+    # Regenerating the baseline doesn't modify the result, even if it's linked
+    write_image(baseline, b'new baseline')
+    assert result.read_bytes() == b'baseline'
+    link_or_copy(baseline, result)
+    assert result.read_bytes() == b'new baseline'
+
+
+@pytest.mark.parametrize('workers', [0, 2])
+def test_vector_conversions_cached(pytester, workers):
+    path = pytester_path(pytester)
+    code = """
+        import matplotlib.pyplot as plt
+        import pytest
+        @pytest.mark.mpl_image_compare(savefig_kwargs={{'format': 'eps'}}, deterministic=True)
+        @pytest.mark.parametrize("i", range(2))
+        def test_mpl(i):
+            fig, ax = plt.subplots()
+            ax.plot([1, 3, 2], linewidth={linewidth})
+            return fig
+        """
+    pytester.makepyfile(code.format(linewidth=1))
+    pytester.runpytest(f'--mpl-generate-path={path / "baseline"}')
+    # Count the conversions made by a converter which doesn't need Ghostscript
+    pytester.makeconftest(
+        f"""
+        import pytest
+        from PIL import Image
+        import matplotlib.testing.compare
+        def convert(old, new):
+            with open(r"{path / 'conversions.txt'}", "a") as fp:
+                fp.write(str(old) + "\\n")
+            Image.new("RGB", (10, 10), "white").save(new)
+        @pytest.fixture(autouse=True)
+        def fake_converter(monkeypatch):
+            monkeypatch.setitem(matplotlib.testing.compare.converter, "eps", convert)
+        """
+    )
+    # Both tests have identical baseline images and identical result images
+    pytester.makepyfile(code.format(linewidth=2))
+    for expected_conversions in (['baseline.eps', 'result.eps'], ['result.eps']):
+        result = pytester.runpytest('--mpl', f'--mpl-baseline-path={path / "baseline"}',
+                                    f'--mpl-comparison-workers={workers}')
+        result.assert_outcomes(passed=2)
+        with open(path / 'conversions.txt') as fp:
+            conversions = [Path(line).name for line in fp.read().split()]
+        if workers:  # The baseline and result images are converted at the same time
+            assert set(conversions) == set(expected_conversions)
+        else:
+            assert conversions == expected_conversions
+        (path / 'conversions.txt').unlink()
+
+
+@pytest.mark.parametrize('cache_size, expected_conversions', [(1, 3), (2, 2)])
+def test_vector_conversions_cache_bounded(pytester, cache_size, expected_conversions):
+    path = pytester_path(pytester)
+    pytester.makepyfile(
+        """
+        import matplotlib.pyplot as plt
+        import pytest
+        @pytest.mark.mpl_image_compare(savefig_kwargs={'format': 'eps'}, deterministic=True)
+        @pytest.mark.parametrize("i", range(3))
+        def test_mpl(i):
+            fig, ax = plt.subplots()
+            ax.plot([1, 3, 2], linewidth=i % 2 + 1)
+            return fig
+        """
+    )
+    pytester.makeconftest(
+        f"""
+        import pytest
+        from PIL import Image
+        import matplotlib.testing.compare
+        def convert(old, new):
+            with open(r"{path / 'conversions.txt'}", "a") as fp:
+                fp.write(str(old) + "\\n")
+            Image.new("RGB", (10, 10), "white").save(new)
+        @pytest.fixture(autouse=True)
+        def fake_converter(monkeypatch):
+            monkeypatch.setitem(matplotlib.testing.compare.converter, "eps", convert)
+            monkeypatch.setattr("pytest_mpl.plugin.CONVERTED_RESULTS_CACHE_SIZE", {cache_size})
+        """
+    )
+    # The baseline images differ from the figures, so that all of them are converted
+    (path / 'baseline').mkdir()
+    for i in range(3):
+        (path / 'baseline' / f'test_mpl_{i}.eps').write_text(f'baseline {i % 2}')
+    result = pytester.runpytest('--mpl', f'--mpl-baseline-path={path / "baseline"}')
+    result.assert_outcomes(passed=3)
+    with open(path / 'conversions.txt') as fp:
+        conversions = [Path(line).name for line in fp.read().split()]
+    # The first and last tests have identical images
+    assert conversions.count('result.eps') == expected_conversions
+
+
+def test_vector_converter_missing(pytester):
+    path = pytester_path(pytester)
+    code = """
+        import matplotlib.pyplot as plt
+        import pytest
+        @pytest.mark.mpl_image_compare(savefig_kwargs={{'format': 'eps'}}, deterministic=True)
+        def test_mpl():
+            fig, ax = plt.subplots()
+            ax.plot([1, 3, 2], linewidth={linewidth})
+            return fig
+        """
+    pytester.makepyfile(code.format(linewidth=1))
+    pytester.runpytest(f'--mpl-generate-path={path / "baseline"}')
+    pytester.makeconftest(
+        """
+        import pytest
+        import matplotlib.testing.compare
+        @pytest.fixture(autouse=True)
+        def no_converter(monkeypatch):
+            monkeypatch.delitem(matplotlib.testing.compare.converter, "eps", raising=False)
+        """
+    )
+    pytester.makepyfile(code.format(linewidth=2))
+    result = pytester.runpytest('--mpl', f'--mpl-baseline-path={path / "baseline"}')
+    result.assert_outcomes(failed=1)
+    result.stdout.fnmatch_lines(["*Don't know how to convert .eps files to png*"])
+
+
+def test_group_styles(pytester):
+    path = pytester_path(pytester)
+    pytester.makepyfile(
+        test_styles="""
+        import matplotlib
+        import matplotlib.pyplot as plt
+        import pytest
+
+        def plot(i):
+            fig, ax = plt.subplots()
+            ax.plot([1, i, 3])
+            return fig
+
+        @pytest.mark.mpl_image_compare
+        @pytest.mark.parametrize("i", range(3))
+        def test_classic(i):
+            # The changes of the previous test in the group are reset
+            assert matplotlib.rcParams["lines.linewidth"] == 1.0
+            assert "Leaky" not in matplotlib.rcParams["font.sans-serif"]
+            matplotlib.rcParams["lines.linewidth"] = 5
+            matplotlib.rcParams["font.sans-serif"].insert(0, "Leaky")
+            return plot(i)
+
+        def test_plain():
+            assert matplotlib.rcParams["lines.linewidth"] == 3
+
+        @pytest.mark.mpl_image_compare(style="default")
+        def test_default():
+            assert matplotlib.rcParams["lines.linewidth"] == 1.5
+            return plot(1)
+
+        @pytest.mark.mpl_image_compare
+        def test_classic_again():
+            assert matplotlib.rcParams["lines.linewidth"] == 1.0
+            return plot(2)
+        """
+    )
+    pytester.makeconftest(
+        """
+        import matplotlib
+        def pytest_configure(config):
+            config._linewidth = matplotlib.rcParams["lines.linewidth"]
+            matplotlib.rcParams["lines.linewidth"] = 3
+        def pytest_unconfigure(config):
+            assert matplotlib.rcParams["lines.linewidth"] == 3
+            matplotlib.rcParams["lines.linewidth"] = config._linewidth
+        """
+    )
+    baseline = path / "baseline"
+    result = pytester.runpytest(f"--mpl-generate-path={baseline}")
+    result.assert_outcomes(passed=1, skipped=5)
+
+    # The figures match those made with the style applied for each test
+    result = pytester.runpytest("--mpl", f"--mpl-baseline-path={baseline}", "--mpl-group-styles")
+    result.assert_outcomes(passed=6)
+    result = pytester.runpytest("--mpl", f"--mpl-baseline-path={baseline}")
+    result.assert_outcomes(passed=6)
+
+
+def test_reorder(pytester):
+    pytester.makepyfile(
+        test_reordered="""
+        import matplotlib
+        import matplotlib.pyplot as plt
+        import pytest
+
+        @pytest.mark.mpl_image_compare(savefig_kwargs={"format": "pdf"})
+        def test_pdf():
+            return plt.figure()
+
+        @pytest.mark.mpl_image_compare(style="default")
+        def test_default():
+            return plt.figure()
+
+        def test_plain():
+            pass
+
+        @pytest.mark.mpl_image_compare
+        @pytest.mark.parametrize("i", range(2))
+        def test_png(i):
+            return plt.figure()
+
+        @pytest.mark.mpl_image_compare(style="default")
+        def test_default_again():
+            return plt.figure()
+
+        @pytest.mark.mpl_image_compare(savefig_kwargs={"format": "pdf"})
+        def test_pdf_again():
+            return plt.figure()
+        """
+    )
+    order = ["test_pdf", "test_default", "test_plain", "test_png[[]0[]]", "test_png[[]1[]]",
+             "test_default_again", "test_pdf_again"]
+    result = pytester.runpytest("--mpl", "--collect-only", "-q")
+    result.stdout.fnmatch_lines([f"*::{name}" for name in order])
+
+    result = pytester.runpytest("--mpl", "--mpl-reorder", "--collect-only", "-q")
+    order = [order[i] for i in (2, 0, 6, 1, 5, 3, 4)]
+    result.stdout.fnmatch_lines([f"*::{name}" for name in order])
+
+    # Tests are only reordered when requested
+    result = pytester.runpytest("--mpl-reorder", "--collect-only", "-q")
+    result.stdout.fnmatch_lines(["*::test_pdf", "*::test_default", "*::test_plain"])
+
+
+def test_lazy_imports(pytester):
+    # The heavy dependencies are only imported when a figure test needs them
+    pytester.makepyfile(
+        test_plain="""
+        def test_plain():
+            pass
+        """
+    )
+    pytester.makeconftest(
+        """
+        import sys
+        def pytest_unconfigure(config):
+            heavy = ["matplotlib", "numpy", "PIL", "jinja2", "imagehash", "sqlite3",
+                     "multiprocessing", "concurrent.futures.process"]
+            print("IMPORTED:", sorted(name for name in heavy if name in sys.modules))
+        """
+    )
+    result = pytester.runpytest_subprocess("-s")
+    result.assert_outcomes(passed=1)
+    result.stdout.fnmatch_lines(["IMPORTED: []"])
+    assert "Matplotlib:" not in result.stdout.str()
+
+    # Matplotlib is imported for the report header when the plugin is enabled
+    result = pytester.runpytest_subprocess("-s", "--mpl")
+    result.assert_outcomes(passed=1)
+    result.stdout.fnmatch_lines(["Matplotlib: *", "IMPORTED: [[]*'matplotlib'*[]]"])
+    assert "jinja2" not in result.stdout.str()
+    assert "imagehash" not in result.stdout.str()
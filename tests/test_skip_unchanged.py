@@ -0,0 +1,85 @@
+import json
+
+from helpers import pytester_path
+
+PYFILE = (
+    """
+    import matplotlib.pyplot as plt
+    import pytest
+    @pytest.mark.mpl_image_compare({kwargs})
+    @pytest.mark.parametrize("i", range(2))
+    def test_mpl(i):
+        fig, ax = plt.subplots()
+        ax.plot([1, 2, {last}])
+        ax.set_title(str(i))
+        return fig
+    """
+)
+
+
+def run(pytester, *args):
+    path = pytester_path(pytester)
+    if not any(arg.startswith("--mpl-hash-library") for arg in args):
+        args += (f"--mpl-baseline-path={path / 'baseline'}",)
+    return pytester.runpytest("--mpl", "--mpl-skip-unchanged", *args)
+
+
+def test_skip_unchanged(pytester):
+    path = pytester_path(pytester)
+    pytester.makepyfile(test_figures=PYFILE.format(kwargs="", last=3))
+    pytester.runpytest(f"--mpl-generate-path={path / 'baseline'}")
+
+    run(pytester).assert_outcomes(passed=2)
+    result = run(pytester)
+    result.assert_outcomes(skipped=2)
+    # Tests are only skipped with the option
+    pytester.runpytest("--mpl", f"--mpl-baseline-path={path / 'baseline'}").assert_outcomes(
+        passed=2)
+
+    # Changes to the configuration
+    run(pytester, "--mpl-default-tolerance=3").assert_outcomes(passed=2)
+    run(pytester, "--mpl-default-tolerance=3").assert_outcomes(skipped=2)
+    run(pytester).assert_outcomes(passed=2)
+
+    # Changes to the marker options
+    pytester.makepyfile(test_figures=PYFILE.format(kwargs="tolerance=3", last=3))
+    run(pytester).assert_outcomes(passed=2)
+    run(pytester).assert_outcomes(skipped=2)
+
+    # Changes to the test function, and failing tests are always run again
+    pytester.makepyfile(test_figures=PYFILE.format(kwargs="tolerance=3", last=1))
+    run(pytester).assert_outcomes(failed=2)
+    run(pytester).assert_outcomes(failed=2)
+    pytester.makepyfile(test_figures=PYFILE.format(kwargs="tolerance=3", last=3))
+    run(pytester).assert_outcomes(passed=2)
+    run(pytester).assert_outcomes(skipped=2)
+
+
+def test_baseline_changed(pytester):
+    path = pytester_path(pytester)
+    pytester.makepyfile(test_figures=PYFILE.format(kwargs="", last=3))
+    pytester.runpytest(f"--mpl-generate-path={path / 'baseline'}")
+    run(pytester).assert_outcomes(passed=2)
+
+    # Replace the baseline image of one of the tests
+    baseline = path / "baseline" / "test_mpl_0.png"
+    other_baseline = path / "baseline" / "test_mpl_1.png"
+    baseline.write_bytes(other_baseline.read_bytes())
+    run(pytester).assert_outcomes(skipped=1, failed=1)
+
+
+def test_hash_changed(pytester):
+    path = pytester_path(pytester)
+    hash_library = path / "hash_library.json"
+    pytester.makepyfile(test_figures=PYFILE.format(kwargs="", last=3))
+    pytester.runpytest(f"--mpl-generate-hash-library={hash_library}")
+    args = (f"--mpl-hash-library={hash_library}",)
+    run(pytester, *args).assert_outcomes(passed=2)
+    run(pytester, *args).assert_outcomes(skipped=2)
+
+    with open(hash_library) as fp:
+        hashes = json.load(fp)
+    hashes["test_figures.test_mpl[0]"] = "0" * 64
+    with open(hash_library, "w") as fp:
+        json.dump(hashes, fp)
+    run(pytester, *args).assert_outcomes(skipped=1, failed=1)
@@ -0,0 +1,73 @@
+import json
+
+import pytest
+from helpers import pytester_path
+
+pytest.importorskip("xdist")
+
+N_TESTS = 6
+
+PYFILE = (
+    """
+    import matplotlib.pyplot as plt
+    import pytest
+    @pytest.mark.mpl_image_compare
+    @pytest.mark.parametrize("i", range({n_tests}))
+    def test_mpl(i):
+        fig, ax = plt.subplots()
+        ax.plot([1, i, 3])
+        return fig
+    """
+)
+
+TEST_NAMES = [f"test_{{name}}.test_mpl[{i}]" for i in range(N_TESTS)]
+
+
+def test_generate_hash_library(pytester):
+    path = pytester_path(pytester)
+    pytester.makepyfile(PYFILE.format(n_tests=N_TESTS))
+    hash_library = path / "hash_library.json"
+    pytester.runpytest_subprocess("-n", "2", f"--mpl-generate-hash-library={hash_library}")
+    with open(hash_library) as fp:
+        hashes = json.load(fp)
+    hashes.pop("pytest-mpl")
+    names = [name.format(name="generate_hash_library") for name in TEST_NAMES]
+    assert sorted(hashes) == sorted(names)
+
+    # The merged library is used to compare the figures in parallel
+    result = pytester.runpytest_subprocess("-n", "2", "--mpl", f"--mpl-hash-library={hash_library}")
+    result.assert_outcomes(passed=N_TESTS)
+
+
+@pytest.mark.parametrize("results_path", [True, False])
+def test_summary(pytester, results_path):
+    path = pytester_path(pytester)
+    pytester.makepyfile(PYFILE.format(n_tests=N_TESTS))
+    pytester.runpytest_subprocess(f"--mpl-generate-path={path / 'baseline'}")
+    # Change the figures so that all of the tests fail
+    pytester.makepyfile(PYFILE.format(n_tests=N_TESTS).replace("[1, i, 3]", "[3, i, 1]"))
+
+    args = ["-n", "2", "--mpl", f"--mpl-baseline-path={path / 'baseline'}",
+            "--mpl-generate-summary=html,json"]
+    if results_path:
+        args.append(f"--mpl-results-path={path / 'results'}")
+    result = pytester.runpytest_subprocess(*args)
+    result.assert_outcomes(failed=N_TESTS)
+
+    # The controller writes a single summary of the tests run by all workers
+    summary_lines = [line for line in result.outlines
+                     if line.startswith("A JSON report can be found at: ")]
+    assert len(summary_lines) == 1
+    results_json = path / summary_lines[0].split(": ", 1)[1]
+    if results_path:
+        assert results_json == path / "results" / "results.json"
+    results_dir = results_json.parent
+    assert (results_dir / "fig_comparison.html").exists()
+    with open(results_json) as fp:
+        results = json.load(fp)
+    names = [name.format(name="summary") for name in TEST_NAMES]
+    assert sorted(results) == sorted(names)
+    for summary in results.values():
+        assert summary["status"] == "failed"
+        for image in ["baseline_image", "diff_image", "result_image"]:
+            assert (results_dir / summary[image]).exists()